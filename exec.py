@@ -1,16 +1,27 @@
-# V2.5
+# V2.10
 
 from __future__ import annotations
-from os import path
+import asyncio
+from codecs import getincrementaldecoder
+from locale import getpreferredencoding
+from os import path, read
+from queue import Empty, Queue
 import subprocess
-from multiprocessing import Process, Queue
-from sys import stderr, stdout
+from sys import platform, stderr, stdout
 from threading import Thread, current_thread
-from typing import IO, Any, Callable, Literal, Optional, overload
+from time import monotonic
+from typing import IO, Any, AsyncIterator, Callable, Literal, Optional, overload
 
 from utility import StreamAutoFlush
 
+if platform != "win32":
+    from os import killpg
+    from signal import SIGKILL
+
 __g_thrads: list[Thread] = []
+_ENCODING = "ansi" if platform == "win32" else getpreferredencoding(False)
+_READ_SIZE = 1 << 16
+_ASYNC_QUEUE_SIZE = 16
 
 def convert_to_cmd(cmd: str) -> str:
     return f'cmd /c "{cmd}"'
@@ -33,9 +44,7 @@ def exec_programm(cmd: str, communicate: Literal[False]) -> None:
 
 def exec_programm(cmd: str, communicate: bool = True) -> Optional[tuple[str, str]]:
     """if communicate=False -> non-blocking"""
-    startupinfo = subprocess.STARTUPINFO()
-    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-    t = subprocess.Popen(cmd, startupinfo=startupinfo,
+    t = subprocess.Popen(cmd, startupinfo=_startupinfo(),
                          stderr=subprocess.PIPE, stdout=subprocess.PIPE)
     if communicate:
         t_out, t_err = t.communicate()
@@ -45,47 +54,217 @@ def exec_programm(cmd: str, communicate: bool = True) -> Optional[tuple[str, str
         return None
 
 
-def exec_programm_multiprocessed(cmd: str, callback_out: Callable[[str], Any] = lambda str: None, callback_err: Callable[[str], Any] = lambda str: None, callback_finished: Callable[[], Any] = lambda: None) -> None:
-    t_t = Thread(target=__exec_programm_multiprocessed_inner1, args=(cmd, callback_out, callback_err, callback_finished))
+async def exec_programm_async(cmd: str, *, timeout: Optional[float] = None) -> tuple[str, str]:
+    """exec_programm for asyncio (cmd is run by the shell), returnValue: (stdout, stderr)
+    the child and its children are killed if timeout (seconds, raises asyncio.TimeoutError) expires or the task is cancelled"""
+    t = await __create_subprocess_async(cmd)
+    try:
+        t_out, t_err = await asyncio.wait_for(t.communicate(), timeout)
+    except BaseException:
+        await __kill_async(t)
+        raise
+    return t_out.decode(_ENCODING, errors="replace").replace("\u0008", ""), t_err.decode(_ENCODING, errors="replace").replace("\u0008", "")
+
+
+async def exec_programm_iter(cmd: str, *, line_mode: bool = True, max_latency_s: float = 0.1, timeout: Optional[float] = None) -> AsyncIterator[tuple[Literal["out", "err"], str]]:
+    """async iterator over the output of cmd (run by the shell) as ("out" | "err", text), text is split like exec_programm_multiprocessed passes it to the callbacks
+    the child and its children are killed if timeout (seconds for the whole command, raises asyncio.TimeoutError) expires, the task is cancelled or the iteration is stopped early"""
+    t = await __create_subprocess_async(cmd)
+    # bounded, a slow consumer stops the readers and so the child (pipe flow control) instead of buffering its whole output
+    t_queue: asyncio.Queue[Optional[tuple[Literal["out", "err"], str]]] = asyncio.Queue(_ASYNC_QUEUE_SIZE)
+
+    async def reader(pipe: asyncio.StreamReader, name: Literal["out", "err"]) -> None:
+        t_pending: list[tuple[Literal["out", "err"], str]] = []
+        t_stream = _OutputStream(lambda text: t_pending.append((name, text)), line_mode, max_latency_s)
+        # the read is not cancelled by the latency timeout, so no data is lost and a finished read always wins over the flush
+        t_read = asyncio.ensure_future(pipe.read(_READ_SIZE))
+        try:
+            while True:
+                await asyncio.wait((t_read,), timeout=_next_timeout((t_stream,)))
+                if t_read.done():
+                    if not (t_data := t_read.result()):
+                        break
+                    t_stream.feed(t_data)
+                    t_read = asyncio.ensure_future(pipe.read(_READ_SIZE))
+                else:
+                    t_stream.flush_expired()
+                if t_pending:
+                    for item in t_pending:
+                        await t_queue.put(item)
+                    t_pending.clear()
+                    # the time blocked by a slow consumer is not latency of the incomplete line
+                    t_stream.restart_deadline()
+        finally:
+            t_read.cancel()
+        t_stream.close()
+        for item in t_pending:
+            await t_queue.put(item)
+        await t_queue.put(None)
+
+    t_readers = [asyncio.ensure_future(reader(t.stdout, "out")), asyncio.ensure_future(reader(t.stderr, "err"))]  # type:ignore
+    t_deadline = None if timeout == None else asyncio.get_running_loop().time() + timeout
+    try:
+        t_open = len(t_readers)
+        while t_open:
+            t_item = await asyncio.wait_for(t_queue.get(), None if t_deadline == None else t_deadline - asyncio.get_running_loop().time())
+            if t_item == None:
+                t_open -= 1
+            else:
+                yield t_item
+        await t.wait()
+    finally:
+        for r in t_readers:
+            r.cancel()
+        await __kill_async(t)
+
+
+async def __create_subprocess_async(cmd: str) -> asyncio.subprocess.Process:
+    # own process group on posix, so a timeout also kills the commands started by the shell
+    return await asyncio.create_subprocess_shell(cmd, startupinfo=_startupinfo(), start_new_session=platform != "win32",
+                                                 stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+
+
+async def __kill_async(process: asyncio.subprocess.Process) -> None:
+    if process.returncode == None:
+        try:
+            if platform == "win32":
+                t_kill = await asyncio.create_subprocess_exec("taskkill", "/F", "/T", "/PID", str(process.pid), startupinfo=_startupinfo(),
+                                                              stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+                await t_kill.wait()
+            else:
+                killpg(process.pid, SIGKILL)
+        except ProcessLookupError:
+            pass
+    await process.wait()
+
+
+def exec_programm_multiprocessed(cmd: str, callback_out: Callable[[str], Any] = lambda str: None, callback_err: Callable[[str], Any] = lambda str: None, callback_finished: Callable[[], Any] = lambda: None, *, line_mode: bool = False, max_latency_s: float = 0.1) -> None:
+    """non-blocking, the output is read in large chunks and passed to the callbacks (from one background thread)
+    line_mode=False: every decoded chunk as soon as it is read, line_mode=True: complete lines (with line end),
+    an incomplete line is passed on after max_latency_s"""
+    t_t = Thread(target=__exec_programm_multiprocessed_inner, args=(cmd, callback_out, callback_err, callback_finished, line_mode, max_latency_s))
     t_t.start()
 
-def __exec_programm_multiprocessed_inner1(cmd: str, callback_out: Callable[[str], Any], callback_err: Callable[[str], Any], callback_finished: Callable[[], Any]) -> None:
+def __exec_programm_multiprocessed_inner(cmd: str, callback_out: Callable[[str], Any], callback_err: Callable[[str], Any], callback_finished: Callable[[], Any], line_mode: bool, max_latency_s: float) -> None:
     __g_thrads.append(current_thread())
-    t_queue_out: Queue[str] = Queue()
-    t_queue_err: Queue[str] = Queue()
+    try:
+        t = subprocess.Popen(cmd, startupinfo=_startupinfo(), stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+        t_streams = {t.stdout: _OutputStream(callback_out, line_mode, max_latency_s), t.stderr: _OutputStream(callback_err, line_mode, max_latency_s)}
 
-    t_p = Process(target=__exec_programm_multiprocessed_inner2,
-                  args=(cmd, (t_queue_out, t_queue_err)))
-    t_p.start()
+        if platform == "win32":
+            __stream_output_threaded(t_streams)  # type:ignore
+        else:
+            __stream_output_selector(t_streams)  # type:ignore
 
-    while (t_p.is_alive()):
-        while not t_queue_out.empty():
-            callback_out(t_queue_out.get())
-        while not t_queue_err.empty():
-            callback_err(t_queue_err.get())
+        t.wait()
+    finally:
+        # also if the programm could not be started, callers wait for callback_finished
+        try:
+            callback_finished()
+        finally:
+            __g_thrads.remove(current_thread())
 
-    t_p.join()
-    callback_finished()
-    __g_thrads.remove(current_thread())
 
+def __stream_output_selector(streams: dict[IO[bytes], _OutputStream]) -> None:
+    from selectors import EVENT_READ, DefaultSelector
+    with DefaultSelector() as t_selector:
+        for pipe, stream in streams.items():
+            t_selector.register(pipe, EVENT_READ, stream)
+        while t_selector.get_map():
+            for key, _ in t_selector.select(_next_timeout(streams.values())):
+                if (t_data := read(key.fd, _READ_SIZE)):
+                    key.data.feed(t_data)
+                else:
+                    t_selector.unregister(key.fileobj)
+                    key.data.close()
+            for stream in streams.values():
+                stream.flush_expired()
 
-def __exec_programm_multiprocessed_inner2(p_arg: str, p_queues: tuple[Queue[str], Queue[str]]) -> None:
-    startupinfo = subprocess.STARTUPINFO()
-    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-    t = subprocess.Popen(p_arg, startupinfo=startupinfo,
-                         stderr=subprocess.PIPE, stdout=subprocess.PIPE)
 
-    t_out = Thread(target=__get_output, args=(t.stdout, p_queues[0]))
-    t_err = Thread(target=__get_output, args=(t.stderr, p_queues[1]))
-    t_out.start()
-    t_err.start()
-    t_out.join()
-    t_err.join()
+def __stream_output_threaded(streams: dict[IO[bytes], _OutputStream]) -> None:
+    """pipes can not be selected on Windows, one reader thread per pipe passes the chunks to this thread"""
+    t_queue: Queue[tuple[_OutputStream, bytes]] = Queue()
+
+    def reader(pipe: IO[bytes], stream: _OutputStream) -> None:
+        while (t_data := read(pipe.fileno(), _READ_SIZE)):
+            t_queue.put((stream, t_data))
+        t_queue.put((stream, b""))
 
+    for pipe, stream in streams.items():
+        Thread(target=reader, args=(pipe, stream), daemon=True).start()
+    t_open = len(streams)
+    while t_open:
+        try:
+            t_stream, t_data = t_queue.get(timeout=_next_timeout(streams.values()))
+        except Empty:
+            t_data = None
+        if t_data:
+            t_stream.feed(t_data)
+        elif t_data == b"":
+            t_stream.close()
+            t_open -= 1
+        for stream in streams.values():
+            stream.flush_expired()
 
-def __get_output(bytes: IO[bytes], queue: Queue[str]):
-    while (t_line := bytes.read(1)):
-        queue.put(t_line.decode("ansi").replace(u"\u0008", ""))
+
+def _next_timeout(streams: Any) -> Optional[float]:
+    t_deadlines = [s.deadline for s in streams if s.deadline != None]
+    return max(min(t_deadlines) - monotonic(), 0) if t_deadlines else None
+
+
+class _OutputStream():
+    """decodes the chunks of one pipe incrementally and passes them on as chunks or lines"""
+
+    def __init__(self, callback: Callable[[str], Any], line_mode: bool, max_latency_s: float):
+        self.__callback = callback
+        self.__line_mode = line_mode
+        self.__max_latency_s = max_latency_s
+        self.__decoder = getincrementaldecoder(_ENCODING)(errors="replace")
+        self.__pending = ""
+        self.deadline: Optional[float] = None
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        t_text = self.__decoder.decode(data, final).replace("\u0008", "")
+        if not self.__line_mode:
+            if t_text:
+                self.__callback(t_text)
+            return
+        t_text = self.__pending + t_text
+        t_start = 0
+        while (t_end := t_text.find("\n", t_start) + 1):
+            self.__callback(t_text[t_start:t_end])
+            t_start = t_end
+        self.__pending = t_text[t_start:]
+        if not self.__pending:
+            self.deadline = None
+        elif self.deadline == None:
+            self.deadline = monotonic() + self.__max_latency_s
+
+    def restart_deadline(self) -> None:
+        if self.deadline != None:
+            self.deadline = monotonic() + self.__max_latency_s
+
+    def flush_expired(self) -> None:
+        if self.deadline != None and monotonic() >= self.deadline:
+            self.__flush()
+
+    def __flush(self) -> None:
+        if self.__pending:
+            self.__callback(self.__pending)
+        self.__pending = ""
+        self.deadline = None
+
+    def close(self) -> None:
+        self.feed(b"", final=True)
+        self.__flush()
+
+
+def _startupinfo() -> Any:
+    if platform != "win32":
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startupinfo
 
 
 def join_threads() -> None:
@@ -100,6 +279,19 @@ if __name__ == "__main__":
     
     exec_programm_multiprocessed(convert_to_cmd("echo TEST2 && timeout /nobreak 3"), StreamAutoFlush(stdout.buffer).write, StreamAutoFlush(stderr.buffer).write, lambda: print("TEST2: FINISHED"))
 
+    # exec_programm_iter in line_mode: every item except the last is a complete line, also with a slow consumer
+    async def check_lines() -> None:
+        from sys import executable
+        for t_delay in (0, 0.2):
+            t_items: list[str] = []
+            async for _, text in exec_programm_iter(f"{executable} -c \"for i in range(300000): print(i)\""):
+                t_items.append(text)
+                if t_delay and len(t_items) % 50000 == 0:
+                    await asyncio.sleep(t_delay)
+            assert all(t.endswith("\n") for t in t_items[:-1]), f"exec_programm_iter split a line (delay {t_delay})"
+
+    asyncio.run(check_lines())
+
     print("EOF")
     
     join_threads()
@@ -1,17 +1,36 @@
-# V1.0
+# V1.32
 
 from __future__ import annotations
+import atexit
+import builtins
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from copy import copy
 from datetime import datetime
-from glob import glob
+from glob import escape, glob
+from operator import index as operator_index
+from queue import Queue
+from shutil import copyfileobj
 from sys import stderr
-from typing import Any, Literal, Optional, TextIO, overload
+from threading import Condition, Lock, Thread, Timer, current_thread
+from time import perf_counter_ns, strftime, time
+from traceback import extract_tb, format_exception_only
+from zlib import crc32
+from typing import Any, Callable, ContextManager, Literal, Optional, TextIO, overload
+from weakref import WeakSet
 
 import logging
-from os import devnull, getpid, path
+from json import JSONEncoder
+from json.encoder import encode_basestring as encode_json_string
+import re
+from os import O_CREAT, O_EXCL, O_WRONLY, close, devnull, getpid, linesep, open as os_open, path, remove, rename, replace
 from enum import Enum
 import warnings
 
-from utility import FileAutoSave, check_file_already_open, convert_relpath_to_script_abspath
+from logreader import (BIN_ARG_FALSE, BIN_ARG_FLOAT, BIN_ARG_INT, BIN_ARG_LONG, BIN_ARG_NONE, BIN_ARG_STR, BIN_ARG_STRUCTS, BIN_ARG_TRUE, BIN_BASE, BIN_FLAG_EXC,
+                       BIN_FLAG_LITERAL, BIN_FLAG_RAW, BIN_LENGTH, BIN_NO_STRING, BIN_RECORD, BIN_SESSION, BIN_SESSION_INIT_MESSAGE, BIN_STRING, BIN_TAG_BASE,
+                       BIN_TAG_RECORD, BIN_TAG_SESSION, BIN_TAG_STRING, BIN_TEMPLATE, BINARY_MAGIC, IDX_ENTRY, IDX_LEVELS, INDEX_MAGIC)
+from utility import AppendFile, BinaryFileAutoSave, FileAutoSave, SyncPolicy, check_file_already_open, convert_relpath_to_script_abspath
 
 
 # Enums:
@@ -25,6 +44,18 @@ class LOG_LEVEL(Enum):
     CRITICAL = 50
 
 
+class BACKPRESSURE(Enum):
+    BLOCK = 0
+    DROP_OLDEST = 1
+    DROP_BELOW_LEVEL = 2
+
+
+class COMPRESSION(Enum):
+    NONE = 0
+    GZIP = 1
+    XZ = 2
+
+
 # Exceptions:
 
 class InternalError(Exception):
@@ -36,11 +67,139 @@ class FileBusy(Exception):
         super().__init__(msg, *args, **kwargs)
 
 
+class RotationNotSupported(Exception):
+    def __init__(self, msg: str = 'shared logfiles can not be rotated', *args: Any, **kwargs: Any):
+        super().__init__(msg, *args, **kwargs)
+
+
+class IndexNotSupported(Exception):
+    def __init__(self, msg: str = 'shared logfiles can not be indexed', *args: Any, **kwargs: Any):
+        super().__init__(msg, *args, **kwargs)
+
+
 class HandlerDetached(Exception):
     def __init__(self, msg: str = 'handler is detached', *args: Any, **kwargs: Any):
         super().__init__(msg, *args, **kwargs)
 
 
+class _BackgroundWorker():
+    """runs housekeeping tasks (compression, pruning) on one daemon thread, pending tasks are finished at exit"""
+
+    def __init__(self):
+        self.__queue: Queue[Optional[Callable[[], Any]]] = Queue()
+        self.__thread: Optional[Thread] = None
+
+    def submit(self, task: Callable[[], Any]) -> None:
+        if self.__thread == None:
+            self.__thread = Thread(target=self.__run, name="logger-background", daemon=True)
+            self.__thread.start()
+            atexit.register(self.join)
+        self.__queue.put(task)
+
+    def __run(self) -> None:
+        while (t_task := self.__queue.get()) != None:
+            try:
+                t_task()
+            except Exception as e:
+                stderr.write(f"logger background task failed: {type(e).__name__}: {e}\n")
+
+    def join(self) -> None:
+        """waits until all submitted tasks are done"""
+        if self.__thread == None:
+            return
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+
+class RotationPolicy():
+    """max_bytes / interval_s: start a new segment once the file would grow beyond max_bytes or the wall-clock interval is over
+    compression: rotated segments are compressed in the background
+    max_segments / max_total_bytes: oldest rotated segments are deleted beyond these limits"""
+
+    def __init__(self, *, max_bytes: Optional[int] = None, interval_s: Optional[float] = None, compression: COMPRESSION = COMPRESSION.GZIP, max_segments: Optional[int] = None, max_total_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.interval_s = interval_s
+        self.compression = compression
+        self.max_segments = max_segments
+        self.max_total_bytes = max_total_bytes
+
+    def next_rollover(self, now: float) -> float:
+        if self.interval_s == None:
+            return float("inf")
+        return (now // self.interval_s + 1) * self.interval_s
+
+
+class IndexPolicy():
+    """a new index block is started after every records records or once the block spans interval_s seconds of log time"""
+
+    def __init__(self, *, records: int = 1000, interval_s: float = 1.0):
+        self.records = records
+        self.interval_s = interval_s
+
+
+class _LogIndex():
+    """writes the sparse time index of a LogFile (<log>.idx, format see logreader), queried by logreader.query_log"""
+
+    def __init__(self, log_path: str, policy: IndexPolicy, log_size: int, sync_policy: Optional[SyncPolicy]):
+        self.__policy = policy
+        t_path = f"{log_path}.idx"
+        if path.exists(t_path) and not self.__valid(t_path, log_size):
+            remove(t_path)
+        t_new = not path.exists(t_path)
+        self.__file = BinaryFileAutoSave(t_path, sync_policy)
+        if t_new:
+            self.__file.write(INDEX_MAGIC)
+        self.__start = log_size
+        self.__reset()
+
+    @staticmethod
+    def __valid(index_path: str, log_size: int) -> bool:
+        """an index that does not belong to the current log (e.g. the log was cleared or replaced) is discarded"""
+        with open(index_path, "rb") as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                return False
+            t_length = f.seek(0, 2) - len(INDEX_MAGIC)
+            if t_length % IDX_ENTRY.size != 0:
+                return False
+            if t_length == 0:
+                return True
+            f.seek(-IDX_ENTRY.size, 2)
+            return IDX_ENTRY.unpack(f.read(IDX_ENTRY.size))[3] <= log_size
+
+    def __reset(self) -> None:
+        self.__count = 0
+        self.__first_time = 0.0
+        self.__last_time = 0.0
+        self.__level_counts = [0] * (len(IDX_LEVELS) + 1)
+        self.due = False
+
+    def record(self, record: logging.LogRecord) -> None:
+        if self.__count == 0:
+            self.__first_time = self.__last_time = record.created
+        else:
+            self.__first_time = min(self.__first_time, record.created)
+            self.__last_time = max(self.__last_time, record.created)
+        self.__count += 1
+        try:
+            self.__level_counts[IDX_LEVELS.index(record.levelno)] += 1
+        except ValueError:
+            self.__level_counts[-1] += 1
+        if self.__count >= self.__policy.records or self.__last_time - self.__first_time >= self.__policy.interval_s:
+            self.due = True
+
+    def checkpoint(self, offset: int) -> None:
+        """ends the current block at offset (all records passed to record() are written before offset)"""
+        if self.__count > 0:
+            self.__file.write(IDX_ENTRY.pack(self.__first_time, self.__last_time, self.__start, offset, *self.__level_counts))
+        self.__start = offset
+        self.__reset()
+
+    def close(self, offset: int) -> None:
+        self.checkpoint(offset)
+        self.__file.close()
+
+
 class _StreamBase():
     def __init__(self, stream: TextIO | _StreamBase | None, *, init_message: bool = True, app_name: Optional[str] = None, init_message_suffix: str = ""):
         self._stream: TextIO | _StreamBase | None = stream
@@ -55,7 +214,7 @@ class _StreamBase():
 
     @staticmethod
     def _convert_time_to_string(time: datetime) -> str:
-        return f"{time.strftime('%Y-%m-%d %H:%M:%S,')}{time.strftime('%f')[0:3]}"
+        return f"{time.strftime('%Y-%m-%d %H:%M:%S')},{time.microsecond // 1000:03d}"
 
     def _write_init_message(self) -> None:
         t_appname = ""
@@ -69,6 +228,11 @@ class _StreamBase():
             raise InternalError()
         return self._stream.write(text)
 
+    def _record_written(self, record: logging.LogRecord) -> None:
+        """called by the handler after the formatted record was written"""
+        if isinstance(self._stream, _StreamBase):
+            self._stream._record_written(record)
+
     def flush(self) -> None:
         if self._stream == None:
             raise InternalError()
@@ -97,49 +261,144 @@ class LogStream(_StreamBase):
 
 
 class LogFile(_StreamBase):
-    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: Optional[str] = None, init_message_suffix: str = "", clear_logfile: bool = False):
+    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: Optional[str] = None, init_message_suffix: str = "", clear_logfile: bool = False, sync_policy: Optional[SyncPolicy] = None, sync_level: Optional[LOG_LEVEL] = None, rotation: Optional[RotationPolicy] = None, shared: bool = False, index: Optional[IndexPolicy] = None):
+        """sync_policy: when the written data is fsynced (default: after every write)
+        sync_level: additionally fsync immediately after a record with this or a higher level
+        rotation: rotated segments are named <name>.<YYYYmmdd-HHMMSS>[-n]<ext>[.gz|.xz]
+        shared: several processes may append to the file at the same time, every record is one O_APPEND write and the
+        separator and init message are written under a file lock (can not be combined with rotation or index)
+        index: writes a sparse time index to <file_path>.idx for logreader.query_log (an uncompressed rotated segment keeps its index)"""
         self._path = file_path = convert_relpath_to_script_abspath(file_path)
-
-        if check_file_already_open(file_path):
+        self._sync_level = sync_level
+        self._sync_policy = sync_policy
+        self._rotation = rotation
+        self._init_message = init_message
+        self._index_policy = index
+        self._index: Optional[_LogIndex] = None
+
+        if shared:
+            if rotation != None:
+                raise RotationNotSupported()
+            if index != None:
+                raise IndexNotSupported()
+        elif check_file_already_open(file_path):
             raise FileBusy()
 
         if clear_logfile:
             if path.exists(file_path):
                 remove(file_path)
+            if path.exists(f"{file_path}.idx"):
+                remove(f"{file_path}.idx")
 
-        t_newlines = False
-        if path.exists(file_path):
-            with open(file_path, "r") as f:
-                if f.read() != "":
-                    t_newlines = True
+        self._next_rollover = rotation.next_rollover(time()) if rotation != None else float("inf")
 
-        super().__init__(FileAutoSave(file_path),
-                         init_message=False, app_name=app_name, init_message_suffix=init_message_suffix)
+        t_stream = AppendFile(file_path, sync_policy) if shared else FileAutoSave(file_path, sync_policy)
+        super().__init__(t_stream, init_message=False, app_name=app_name, init_message_suffix=init_message_suffix)
 
-        if t_newlines:
-            self.write("\n"*blank_lines)
+        with self.__lock():
+            # only the size is needed to decide about the separator, never read the (possibly huge) existing log
+            self._size = path.getsize(file_path)
+            if index != None:
+                self._index = _LogIndex(file_path, index, self._size, sync_policy)
+            if self._size > 0:
+                self.write("\n"*blank_lines)
 
-        if init_message:
+            if init_message:
+                self._write_init_message()
+
+    def __lock(self) -> ContextManager[None]:
+        if isinstance(self._stream, AppendFile):
+            return self._stream.lock()
+        return nullcontext()
+
+    def write(self, text: str) -> int:
+        if self._index != None and self._index.due and self._stream != None:
+            self._index.checkpoint(self._stream.tell())
+        t_bytes = self.__byte_size(text) if self._rotation != None and self._stream != None else 0
+        if self._rotation != None and self._size > 0:
+            if (self._rotation.max_bytes != None and self._size + t_bytes > self._rotation.max_bytes) or time() >= self._next_rollover:
+                self.rotate()
+        t_return = super().write(text)
+        self._size += t_bytes
+        return t_return
+
+    def __byte_size(self, text: str) -> int:
+        # _size counts bytes like path.getsize, the text is encoded and every "\n" is written as os.linesep
+        t_size = len(text) if text.isascii() else len(text.encode(self._stream.encoding, self._stream.errors))  # type:ignore
+        return t_size + text.count("\n") * (len(linesep) - 1)
+
+    def rotate(self) -> None:
+        """closes the current segment, renames it and continues in a new file (compression and pruning run in the background)"""
+        if self._stream == None:
+            raise InternalError()
+        if isinstance(self._stream, AppendFile):
+            raise RotationNotSupported()
+        if self._index != None:
+            self._index.close(self._stream.tell())
+        self._stream.close()
+        t_segment = self.__segment_path()
+        rename(self._path, t_segment)
+        if self._index_policy != None:
+            rename(f"{self._path}.idx", f"{t_segment}.idx")
+            self._index = _LogIndex(self._path, self._index_policy, 0, self._sync_policy)
+        self._stream = FileAutoSave(self._path, self._sync_policy)
+        self._size = 0
+        if self._rotation != None:
+            self._next_rollover = self._rotation.next_rollover(time())
+            t_rotation = self._rotation
+            _background_worker.submit(lambda: _finish_rotated_segment(self._path, t_segment, t_rotation))
+        if self._init_message:
             self._write_init_message()
 
+    def __segment_path(self) -> str:
+        t_root, t_ext = path.splitext(self._path)
+        t_base = f"{t_root}.{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        t_path, t_n = f"{t_base}{t_ext}", 1
+        while glob(f"{escape(t_path)}*"):
+            t_n += 1
+            t_path = f"{t_base}-{t_n}{t_ext}"
+        return t_path
+
+    def _record_written(self, record: logging.LogRecord) -> None:
+        if self._index != None:
+            self._index.record(record)
+        if self._sync_level != None and record.levelno >= self._sync_level.value:
+            self.sync()
+
+    def close(self) -> None:
+        if self._index != None and self._stream != None and not self._stream.closed:
+            self._index.close(self._stream.tell())
+            self._index = None
+        super().close()
+
+    def sync(self) -> None:
+        """fsync all data written so far"""
+        if isinstance(self._stream, (FileAutoSave, AppendFile)):
+            self._stream.sync()
+
     @property
     def path(self) -> str:
         return self._path
 
 
 class LogFileOnDemand(_StreamBase):
-    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: Optional[str] = None, init_message_suffix: str = "", clear_logfile: bool = False):
+    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: Optional[str] = None, init_message_suffix: str = "", clear_logfile: bool = False, sync_policy: Optional[SyncPolicy] = None, sync_level: Optional[LOG_LEVEL] = None, shared: bool = False, index: Optional[IndexPolicy] = None):
         super().__init__(None, init_message=False, app_name=app_name, init_message_suffix=init_message_suffix)
         file_path = convert_relpath_to_script_abspath(file_path)
         self.__path = file_path
         self.__blank_lines = blank_lines
         self.__init_message = init_message
         self.__clear_logfile = clear_logfile
+        self.__sync_policy = sync_policy
+        self.__sync_level = sync_level
+        self.__shared = shared
+        self.__index = index
 
     def write(self, text: str) -> int:
         if self._stream == None:
             self._stream = LogFile(self.__path, blank_lines=self.__blank_lines,
-                                   init_message=self.__init_message, app_name=self._app_name, init_message_suffix=self._init_message_suffix, clear_logfile=self.__clear_logfile)
+                                   init_message=self.__init_message, app_name=self._app_name, init_message_suffix=self._init_message_suffix, clear_logfile=self.__clear_logfile,
+                                   sync_policy=self.__sync_policy, sync_level=self.__sync_level, shared=self.__shared, index=self.__index)
 
         return super().write(text)
 
@@ -154,34 +413,82 @@ class LogFileOnDemand(_StreamBase):
 
 
 class CrashLogFile(_StreamBase):
-    def __init__(self, file_path_praefix: str, file_path_suffix: str, *, file_number_digits: int = 3, init_message: bool = True, app_name: str | None = None, init_message_suffix: str = ""):
+    def __init__(self, file_path_praefix: str, file_path_suffix: str, *, file_number_digits: int = 3, init_message: bool = True, app_name: str | None = None, init_message_suffix: str = "", sync_policy: Optional[SyncPolicy] = None, sync_level: Optional[LOG_LEVEL] = None, max_count: Optional[int] = None, max_bytes: Optional[int] = None):
+        """the last used file number is kept in <praefix><suffix>.seq, numbers are claimed with an exclusive create (safe across processes)
+        max_count / max_bytes: the oldest crash logs beyond these limits are deleted in the background"""
         super().__init__(None, init_message=False, app_name=app_name, init_message_suffix=init_message_suffix)
         file_path_praefix = convert_relpath_to_script_abspath(file_path_praefix)
         self.__file_path_praefix = file_path_praefix
         self.__file_path_suffix = file_path_suffix
         self.__init_message = init_message
         self.__file_number_digits = file_number_digits
+        self.__sync_policy = sync_policy
+        self.__sync_level = sync_level
+        self.__max_count = max_count
+        self.__max_bytes = max_bytes
 
     def write(self, text: str) -> int:
         if self._stream == None:
-            t_crash_logs = glob(
-                f"{self.__file_path_praefix}[0-9]*{self.__file_path_suffix}")
-
-            t_num = 1
-            if len(t_crash_logs) > 0:
-                t_crash_logs.sort(reverse=True)
-                t_num = t_crash_logs[0].removeprefix(
-                    self.__file_path_praefix).removesuffix(self.__file_path_suffix)
-                t_num = int(t_num) + 1
-
-            t_path = f"{self.__file_path_praefix}\
-{str(t_num).zfill(self.__file_number_digits)}{self.__file_path_suffix}"
+            t_path = self.__allocate_file()
 
             self._stream = LogFile(
-                t_path, init_message=self.__init_message, app_name=self._app_name, init_message_suffix=self._init_message_suffix)
+                t_path, init_message=self.__init_message, app_name=self._app_name, init_message_suffix=self._init_message_suffix,
+                sync_policy=self.__sync_policy, sync_level=self.__sync_level)
+
+            if self.__max_count != None or self.__max_bytes != None:
+                _background_worker.submit(lambda: self.__prune(t_path))
 
         return super().write(text)
 
+    def __file_path(self, number: int) -> str:
+        return f"{self.__file_path_praefix}{str(number).zfill(self.__file_number_digits)}{self.__file_path_suffix}"
+
+    def __existing_files(self) -> list[tuple[int, str]]:
+        """all existing crash logs, sorted by number"""
+        t_files: list[tuple[int, str]] = []
+        for p in glob(f"{escape(self.__file_path_praefix)}[0-9]*{escape(self.__file_path_suffix)}"):
+            t_num = p[len(self.__file_path_praefix):len(p) - len(self.__file_path_suffix)]
+            if t_num.isdigit():
+                t_files.append((int(t_num), p))
+        t_files.sort()
+        return t_files
+
+    def __allocate_file(self) -> str:
+        t_seq_path = f"{self.__file_path_praefix}{self.__file_path_suffix}.seq"
+        try:
+            with open(t_seq_path, "r") as f:
+                t_num = int(f.read().strip())
+        except (OSError, ValueError):
+            # no (valid) sequence file yet -> continue after the highest existing crash log
+            t_files = self.__existing_files()
+            t_num = t_files[-1][0] if t_files else 0
+
+        while True:
+            t_num += 1
+            t_path = self.__file_path(t_num)
+            try:
+                close(os_open(t_path, O_CREAT | O_EXCL | O_WRONLY))
+                break
+            except FileExistsError:
+                continue
+
+        t_tmp_path = f"{t_seq_path}.{getpid()}.tmp"
+        with open(t_tmp_path, "w") as f:
+            f.write(str(t_num))
+        replace(t_tmp_path, t_seq_path)
+        return t_path
+
+    def __prune(self, current_path: str) -> None:
+        t_files = [(p, path.getsize(p)) for _, p in self.__existing_files() if p != current_path]
+        t_count = len(t_files) + 1
+        t_total = sum(size for _, size in t_files)
+        for p, size in t_files:
+            if (self.__max_count == None or t_count <= self.__max_count) and (self.__max_bytes == None or t_total <= self.__max_bytes):
+                break
+            remove(p)
+            t_count -= 1
+            t_total -= size
+
     def flush(self) -> None:
         if self._stream == None:
             return
@@ -193,22 +500,323 @@ class CrashLogFile(_StreamBase):
 
 
 class MSGBoxStream(_StreamBase):
-    def __init__(self, app_name: Optional[str] = None):
+    def __init__(self, app_name: Optional[str] = None, *, coalesce_s: float = 0.5, max_pending: int = 3, backend: Optional[Callable[[str, str], Any]] = None):
+        """records written within coalesce_s are shown together in one dialog, at most max_pending dialogs wait to be shown
+        (further records are added to the last one), dialogs are shown one after another by a single worker thread
+        backend(title, text) shows a dialog and blocks until it is closed (default: msgbox.create_msg_box)"""
         super().__init__(None, init_message=False, app_name=app_name)
+        self.__coalesce_s = coalesce_s
+        self.__max_pending = max(max_pending, 1)
+        self.__backend = backend if backend != None else _show_msg_box
+        # pending dialogs: [first write time, texts]
+        self.__pending: deque[tuple[float, list[str]]] = deque()
+        self.__condition = Condition()
+        self.__busy = False
+        self.__worker: Optional[Thread] = None
 
     def write(self, text: str) -> int:
-        from utility import msgbox
+        with self.__condition:
+            t_now = time()
+            if self.__pending and (t_now - self.__pending[-1][0] < self.__coalesce_s or len(self.__pending) >= self.__max_pending):
+                self.__pending[-1][1].append(text)
+            else:
+                self.__pending.append((t_now, [text]))
+            if self.__worker == None:
+                self.__worker = Thread(target=self.__worker_loop, name="logger-msgbox", daemon=True)
+                self.__worker.start()
+                atexit.register(self.join)
+            self.__condition.notify_all()
+        return len(text)
+
+    def __worker_loop(self) -> None:
+        while True:
+            with self.__condition:
+                while not self.__pending:
+                    self.__condition.wait()
+                while (t_wait := self.__pending[0][0] + self.__coalesce_s - time()) > 0 and len(self.__pending) == 1:
+                    self.__condition.wait(t_wait)
+                _, t_texts = self.__pending.popleft()
+                self.__busy = True
+            try:
+                self.__backend(self.__title(), "".join(t_texts))
+            except Exception as e:
+                stderr.write(f"logger msgbox backend failed: {type(e).__name__}: {e}\n")
+            with self.__condition:
+                self.__busy = False
+                self.__condition.notify_all()
+
+    def __title(self) -> str:
         t_app_name_str = ""
         if self._app_name != None:
             t_app_name_str = f"{self._app_name} - "
-        msgbox.create_async_msg_box(
-            f"{t_app_name_str}FEHLER", text, msgbox.BUTTON_STYLES.OK)
-        return len(text)
+        return f"{t_app_name_str}FEHLER"
+
+    def join(self) -> None:
+        """blocks until all pending dialogs were shown (and closed)"""
+        with self.__condition:
+            while (self.__pending or self.__busy) and self.__worker != None and self.__worker.is_alive():
+                self.__condition.wait()
 
     def flush(self) -> None:
         return
 
 
+class BinaryLogFile():
+    """compact binary log for high volume tracing (format: see logreader), logger names and message templates are interned
+    in a string table inside the file, arguments are stored packed, decode with logreader.decode_binary_log or 'python logreader.py decode'"""
+
+    def __init__(self, file_path: str, *, blank_lines: int = 3, init_message: bool = True, app_name: Optional[str] = None, init_message_suffix: str = "", clear_logfile: bool = False, sync_policy: Optional[SyncPolicy] = None):
+        self._path = file_path = convert_relpath_to_script_abspath(file_path)
+
+        if check_file_already_open(file_path):
+            raise FileBusy()
+
+        if clear_logfile:
+            if path.exists(file_path):
+                remove(file_path)
+
+        t_empty = not path.exists(file_path) or path.getsize(file_path) == 0
+        self._file = BinaryFileAutoSave(file_path, sync_policy)
+        self.__strings: dict[str, int] = {}
+
+        t_log_start = time()
+        self.__base_ms = int(t_log_start * 1000)
+        t_app_name = app_name.encode("utf-8") if app_name != None else b""
+        t_suffix = init_message_suffix.encode("utf-8")
+        self._file.write(b"".join((BINARY_MAGIC if t_empty else b"",
+                                   BIN_SESSION.pack(BIN_TAG_SESSION, BIN_SESSION_INIT_MESSAGE if init_message else 0, blank_lines, t_log_start,
+                                                    _start_time.timestamp(), getpid(), len(t_app_name) if app_name != None else BIN_NO_STRING, len(t_suffix)),
+                                   t_app_name, t_suffix)))
+
+    def __intern(self, string: str, parts: list[bytes]) -> int:
+        t_id = self.__strings.get(string)
+        if t_id == None:
+            t_id = self.__strings[string] = len(self.__strings)
+            t_data = string.encode("utf-8", errors="replace")
+            parts += (BIN_STRING.pack(BIN_TAG_STRING, t_id, len(t_data)), t_data)
+        return t_id
+
+    def write_record(self, record: logging.LogRecord, exc_text: Optional[str] = None, raw: bool = False) -> int:
+        t_parts: list[bytes] = []
+        t_ms = int(record.created) * 1000 + int(record.msecs)
+        t_offset = t_ms - self.__base_ms
+        if not 0 <= t_offset <= 0xFFFFFFFF:
+            self.__base_ms, t_offset = t_ms, 0
+            t_parts.append(BIN_BASE.pack(BIN_TAG_BASE, t_ms))
+        t_name_id = self.__intern(record.name, t_parts)
+
+        t_flags = (BIN_FLAG_EXC if exc_text else 0) | (BIN_FLAG_RAW if raw else 0)
+        _resolve_lazy_args(record)
+        t_args = _pack_binary_args(record.args) if isinstance(record.msg, str) else None
+        if t_args == None:
+            t_message = record.getMessage().encode("utf-8", errors="replace")
+            t_body = BIN_LENGTH.pack(len(t_message)) + t_message
+            t_flags |= BIN_FLAG_LITERAL
+        else:
+            t_body = BIN_TEMPLATE.pack(self.__intern(record.msg, t_parts), len(record.args or ())) + t_args
+        t_parts += (BIN_RECORD.pack(BIN_TAG_RECORD, t_offset, record.levelno, t_flags, t_name_id), t_body)
+        if exc_text:
+            t_exc = exc_text.encode("utf-8", errors="replace")
+            t_parts += (BIN_LENGTH.pack(len(t_exc)), t_exc)
+        return self._file.write(b"".join(t_parts))
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def sync(self) -> None:
+        self._file.sync()
+
+    def close(self) -> None:
+        self._file.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+
+class _Formatter(logging.Formatter):
+    """formats each record only once per format string, the result is shared by all handlers using the same format
+    raw records (Logger.print) are formatted with the handler's prebuilt raw formatter
+    the format string is compiled into a rendering function and the date part of asctime is cached per second"""
+    _raw_records = True
+
+    def __init__(self, fmt: str, raw_formatter: logging.Formatter, handle_exec_info: bool):
+        super().__init__(fmt)
+        self.__raw_formatter = raw_formatter
+        self.__traceback_refs = False
+        self.__seen_tracebacks: OrderedDict[str, None] = OrderedDict()
+        self.handle_exec_info = handle_exec_info
+        self.__render = _compile_format(fmt)
+        self.__uses_time = super().usesTime()
+        self.__time_cache: tuple[int, str] = (-1, "")
+
+    def usesTime(self) -> bool:
+        return self.__uses_time
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        if datefmt != None:
+            return super().formatTime(record, datefmt)
+        t_second = int(record.created)
+        t_cached_second, t_prefix = self.__time_cache
+        if t_second != t_cached_second:
+            t_prefix = strftime(self.default_time_format, self.converter(record.created))
+            self.__time_cache = (t_second, t_prefix)
+        return f"{t_prefix},{int(record.msecs):03d}"
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        if self.__render == None:
+            return super().formatMessage(record)
+        try:
+            return self.__render(record.__dict__)
+        except KeyError as e:
+            raise ValueError(f"Formatting field not found in record: {e}")
+
+    @property
+    def handle_exec_info(self) -> bool:
+        return self.__handle_exec_info
+
+    @handle_exec_info.setter
+    def handle_exec_info(self, value: bool) -> None:
+        self.__handle_exec_info = value
+        self.__update_key()
+
+    @property
+    def traceback_refs(self) -> bool:
+        return self.__traceback_refs
+
+    @traceback_refs.setter
+    def traceback_refs(self, value: bool) -> None:
+        self.__traceback_refs = value
+        self.__update_key()
+
+    def __update_key(self) -> None:
+        # with traceback_refs the text depends on the tracebacks this formatter has already written, so it is not shared
+        self.__key = (self._cache_key(self.__handle_exec_info), self) if self.__traceback_refs else self._cache_key(self.__handle_exec_info)
+
+    def _cache_key(self, handle_exec_info: bool) -> Any:
+        """formatters with equal keys produce the same text for a record"""
+        return (self._fmt, handle_exec_info)
+
+    def formatException(self, ei: Any) -> str:
+        if (t_formatted := _format_exception_cached(ei[1])) == None:
+            return super().formatException(ei)
+        return t_formatted[0]
+
+    def _exc_text(self, record: logging.LogRecord) -> Optional[str]:
+        """the exception text of record written by this formatter (None: no exception or handle_exec_info is off)"""
+        if not self.__handle_exec_info:
+            return None
+        if record.exc_info and self.__traceback_refs and (t_formatted := _format_exception_cached(record.exc_info[1])) != None:
+            t_text, t_ref, t_exception_only = t_formatted
+            if t_ref in self.__seen_tracebacks:
+                self.__seen_tracebacks.move_to_end(t_ref)
+                return f"[traceback {t_ref} repeated] {t_exception_only}"
+            self.__seen_tracebacks[t_ref] = None
+            if len(self.__seen_tracebacks) > _TRACEBACK_CACHE_SIZE:
+                self.__seen_tracebacks.popitem(last=False)
+            return f"[traceback {t_ref}]\n{t_text}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        return record.exc_text or None
+
+    def format(self, record: logging.LogRecord) -> str:
+        t_raw = self._raw_records and record.__dict__.get(_RAW_RECORD, False)
+        t_key = _RAW_RECORD if t_raw else self.__key
+        t_cache: Optional[dict[Any, str]] = record.__dict__.get(_FORMAT_CACHE)
+        if t_cache == None:
+            t_cache = record.__dict__[_FORMAT_CACHE] = {}
+        elif (t_text := t_cache.get(t_key)) != None:
+            return t_text
+
+        _resolve_lazy_args(record)
+        t_text = self.__raw_formatter.format(record) if t_raw else self._render(record)
+        t_cache[t_key] = t_text
+        return t_text
+
+    def _render(self, record: logging.LogRecord) -> str:
+        record.message = record.getMessage()
+        if self.__uses_time:
+            record.asctime = self.formatTime(record, self.datefmt)
+        t_text = self.formatMessage(record)
+        if (t_exc_text := self._exc_text(record)) != None:
+            t_text = f"{t_text}\n{t_exc_text}" if t_text[-1:] != "\n" else f"{t_text}{t_exc_text}"
+        if record.stack_info:
+            t_text = f"{t_text}\n{self.formatStack(record.stack_info)}" if t_text[-1:] != "\n" else f"{t_text}{self.formatStack(record.stack_info)}"
+        return t_text
+
+
+class _JsonFormatter(_Formatter):
+    """renders one JSON object per record: time, level, name, message, the record attributes in extra_fields and exc / stack if present
+    the serializer for the fixed fields is compiled once per handler"""
+    _raw_records = False
+
+    def __init__(self, extra_fields: tuple[str, ...], raw_formatter: logging.Formatter, handle_exec_info: bool):
+        self.__extra_fields = extra_fields
+        super().__init__("%(message)s", raw_formatter, handle_exec_info)
+        t_parts = ['\'{"time":\'', 'f"{d[\'created\']!r}"', '\',"level":\'', 'f"{enc(d[\'levelname\'])}"',
+                   '\',"name":\'', 'f"{enc(d[\'name\'])}"', '\',"message":\'', 'f"{enc(d[\'message\'])}"']
+        for f in extra_fields:
+            t_parts += [repr(f",{encode_json_string(f)}:"), f'f"{{val(d.get({f!r}))}}"']
+        self.__serialize: Callable[[dict[str, Any]], str] = eval(f"lambda d: {' '.join(t_parts)}", {
+            "__builtins__": {}, "enc": encode_json_string, "val": _encode_json_value})
+
+    def _cache_key(self, handle_exec_info: bool) -> Any:
+        return ("json", self.__extra_fields, handle_exec_info)
+
+    def _render(self, record: logging.LogRecord) -> str:
+        record.message = record.getMessage()
+        t_text = self.__serialize(record.__dict__)
+        if (t_exc_text := self._exc_text(record)) != None:
+            t_text = f"{t_text},\"exc\":{encode_json_string(t_exc_text)}"
+        if record.stack_info:
+            t_text = f"{t_text},\"stack\":{encode_json_string(self.formatStack(record.stack_info))}"
+        return t_text + "}"
+
+
+class Lazy():
+    """log argument, which is evaluated only when a handler formats the record and at most once
+    (queued handlers evaluate it on the calling thread before the record is queued)"""
+    __slots__ = ("__func", "__value", "__lock", "_origin")
+
+    def __init__(self, func: Callable[[], Any]):
+        self.__func: Optional[Callable[[], Any]] = func
+        self.__value: Any = None
+        self.__lock = Lock()
+        # the same for every Lazy created at one call site, used as DuplicateSuppressor fingerprint
+        self._origin: Any = getattr(func, "__code__", func)
+
+    @property
+    def value(self) -> Any:
+        if self.__func != None:
+            with self.__lock:
+                if self.__func != None:
+                    self.__value = self.__func()
+                    self.__func = None
+        return self.__value
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    def __repr__(self) -> str:
+        return repr(self.value)
+
+    def __format__(self, format_spec: str) -> str:
+        return format(self.value, format_spec)
+
+    def __int__(self) -> int:
+        return int(self.value)
+
+    def __float__(self) -> float:
+        return float(self.value)
+
+    def __index__(self) -> int:
+        return operator_index(self.value)
+
+
 class _MaxLogLevelFilter(logging.Filter):
     def __init__(self, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL):
         self.max_log_level = max_log_level
@@ -217,17 +825,588 @@ class _MaxLogLevelFilter(logging.Filter):
         return True if record.levelno <= self.max_log_level.value else False
 
 
+class _DuplicateFilter(logging.Filter):
+    def __init__(self, handler: Handler, window_s: float, max_fingerprints: int):
+        super().__init__()
+        self.handler = handler
+        self.__window_s = window_s
+        self.__max_fingerprints = max_fingerprints
+        self.__lock = Lock()
+        # fingerprint -> [window start, suppressed records, msg of the emitted record (shown in the summary)]
+        self.__fingerprints: OrderedDict[tuple[str, int, Any], list[Any]] = OrderedDict()
+        # reports the suppressed records once their window has ended, also when the fingerprint does not show up again
+        self.__timer: Optional[Timer] = None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.__dict__.get(_SUMMARY_RECORD, False):
+            return True
+        t_msg = record.msg
+        # a Lazy message is fingerprinted by its function (the call site), it is only rendered if the record is emitted
+        t_template = t_msg if type(t_msg) == str else t_msg._origin if type(t_msg) == Lazy else str(t_msg)
+        t_key = (record.name, record.levelno, t_template)
+        t_summaries: list[tuple[tuple[str, int, Any], int, Any]] = []
+        with self.__lock:
+            t_entry = self.__fingerprints.get(t_key)
+            if t_entry == None:
+                self.__fingerprints[t_key] = [record.created, 0, t_msg]
+                if len(self.__fingerprints) > self.__max_fingerprints:
+                    t_old_key, (_, t_old_count, t_old_msg) = self.__fingerprints.popitem(last=False)
+                    if t_old_count:
+                        t_summaries.append((t_old_key, t_old_count, t_old_msg))
+                t_emit = True
+            else:
+                self.__fingerprints.move_to_end(t_key)
+                if record.created - t_entry[0] < self.__window_s:
+                    t_entry[1] += 1
+                    t_emit = False
+                    if self.__timer == None:
+                        self.__schedule(t_entry[0] + self.__window_s - time())
+                else:
+                    if t_entry[1]:
+                        t_summaries.append((t_key, t_entry[1], t_entry[2]))
+                    t_entry[0], t_entry[1], t_entry[2] = record.created, 0, t_msg
+                    t_emit = True
+        for key, count, msg in t_summaries:
+            self.__emit_summary(key, count, msg)
+        return t_emit
+
+    def flush(self) -> None:
+        """emits the summaries of all records suppressed so far"""
+        with self.__lock:
+            t_summaries = [(k, v[1], v[2]) for k, v in self.__fingerprints.items() if v[1]]
+            for v in self.__fingerprints.values():
+                v[1] = 0
+        for key, count, msg in t_summaries:
+            self.__emit_summary(key, count, msg)
+
+    def cancel(self) -> None:
+        with self.__lock:
+            if self.__timer != None:
+                self.__timer.cancel()
+                self.__timer = None
+
+    def __schedule(self, delay: float) -> None:
+        self.__timer = Timer(max(delay, 0), self.__expire)
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def __expire(self) -> None:
+        t_now = time()
+        t_summaries: list[tuple[tuple[str, int, Any], int, Any]] = []
+        t_next: Optional[float] = None
+        with self.__lock:
+            self.__timer = None
+            for key, entry in self.__fingerprints.items():
+                if not entry[1]:
+                    continue
+                if t_now - entry[0] >= self.__window_s:
+                    t_summaries.append((key, entry[1], entry[2]))
+                    entry[1] = 0
+                elif t_next == None or entry[0] + self.__window_s < t_next:
+                    t_next = entry[0] + self.__window_s
+            if t_next != None:
+                self.__schedule(t_next - t_now)
+        for key, count, msg in t_summaries:
+            self.__emit_summary(key, count, msg)
+
+    def __emit_summary(self, key: tuple[str, int, Any], count: int, msg: Any) -> None:
+        t_name, t_levelno, _ = key
+        self.handler._handler.handle(logging.makeLogRecord({"name": t_name, "levelno": t_levelno, "levelname": logging.getLevelName(t_levelno),
+                                                            "msg": "repeated %d times: %s", "args": (count, msg), _SUMMARY_RECORD: True}))
+
+
+class HandlerStats():
+    """snapshot of the counters of a Handler (Handler.stats, get_handler_stats)
+    accepted / filtered: records that were emitted / rejected by log_level, max_log_level or a DuplicateSuppressor
+    bytes_written: written characters for text sinks (not their encoded size), bytes for binary sinks
+    latency_histogram[i]: emits that took less than 2**i µs (and at least 2**(i-1) µs), the last bucket counts all slower ones
+    queue_depth / dropped: records waiting in / discarded by the queue of a queued or collector handler"""
+    __slots__ = ("handler", "accepted", "filtered", "bytes_written", "latency_histogram", "queue_depth", "dropped")
+
+    def __init__(self, handler: Handler, accepted: int, filtered: int, bytes_written: int, latency_histogram: tuple[int, ...], queue_depth: int, dropped: int):
+        self.handler = handler
+        self.accepted = accepted
+        self.filtered = filtered
+        self.bytes_written = bytes_written
+        self.latency_histogram = latency_histogram
+        self.queue_depth = queue_depth
+        self.dropped = dropped
+
+    def latency_percentile(self, percent: float) -> float:
+        """upper bound (µs) of the emit latency of percent % of the accepted records"""
+        t_rank = sum(self.latency_histogram) * percent / 100
+        t_count = 0
+        for i, c in enumerate(self.latency_histogram):
+            t_count += c
+            if c > 0 and t_count >= t_rank:
+                return float(2**i) if i < len(self.latency_histogram) - 1 else float("inf")
+        return 0.0
+
+    def __repr__(self) -> str:
+        return f"<HandlerStats {type(self.handler).__name__}: accepted={self.accepted} filtered={self.filtered} bytes_written={self.bytes_written} \
+p50={self.latency_percentile(50)}µs p99={self.latency_percentile(99)}µs queue_depth={self.queue_depth} dropped={self.dropped}>"
+
+
+class _InstrumentedHandler(logging.Handler):
+    """counts accepted and filtered records, written bytes and the emit latency, the level check is done here
+    (instead of by logging) so records below threshold are counted too"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.threshold = LOG_LEVEL.NOTSET.value
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.accepted = 0
+        self.filtered = 0
+        self.bytes_written = 0
+        self.latency_histogram = [0] * _LATENCY_BUCKETS
+
+    @property
+    def queue_depth(self) -> int:
+        return 0
+
+    @property
+    def dropped(self) -> int:
+        return 0
+
+    def handle(self, record: logging.LogRecord) -> bool:  # type:ignore
+        if record.levelno < self.threshold:
+            with self.lock:
+                self.filtered += 1
+            return False
+        t_result = self.filter(record)
+        if isinstance(t_result, logging.LogRecord):
+            record = t_result
+        with self.lock:
+            if not t_result:
+                self.filtered += 1
+                return False
+            t_start = perf_counter_ns()
+            self.emit(record)
+            t_us = (perf_counter_ns() - t_start) // 1000
+            self.accepted += 1
+            self.latency_histogram[min(t_us.bit_length(), _LATENCY_BUCKETS - 1)] += 1
+        return True
+
+
+class _RouteNode():
+    __slots__ = ("children", "handlers")
+
+    def __init__(self):
+        self.children: dict[str, _RouteNode] = {}
+        self.handlers: list[_InstrumentedHandler] = []
+
+
+class _Router(logging.Handler):
+    """the only handler on the root logger, passes each record to the handlers subscribed to its logger name or a parent of it
+    the subscriptions are kept in a trie of the dotted name parts, the handlers per logger name are cached"""
+
+    def __init__(self):
+        super().__init__()
+        self.__root = _RouteNode()
+        self.__order: dict[_InstrumentedHandler, int] = {}
+        self.__prefixes: dict[_InstrumentedHandler, tuple[str, ...]] = {}
+        self.__next_order = 0
+        self.__routes: dict[str, tuple[_InstrumentedHandler, ...]] = {}
+        self.__routes_lock = Lock()
+
+    def add(self, handler: _InstrumentedHandler, logger_names: Optional[tuple[str, ...]]) -> None:
+        """subscribes handler to logger_names (None: all loggers), replaces an existing subscription"""
+        with self.__routes_lock:
+            self.__unsubscribe(handler)
+            if handler not in self.__order:
+                self.__order[handler] = self.__next_order
+                self.__next_order += 1
+            self.__prefixes[handler] = t_prefixes = ("",) if logger_names == None else tuple(logger_names)
+            for t_prefix in t_prefixes:
+                t_node = self.__root
+                for t_part in t_prefix.split(".") if t_prefix else ():
+                    t_node = t_node.children.setdefault(t_part, _RouteNode())
+                if handler not in t_node.handlers:
+                    t_node.handlers.append(handler)
+            self.__routes = {}
+
+    def remove(self, handler: _InstrumentedHandler) -> None:
+        with self.__routes_lock:
+            self.__unsubscribe(handler)
+            self.__order.pop(handler, None)
+            self.__routes = {}
+
+    def __unsubscribe(self, handler: _InstrumentedHandler) -> None:
+        for t_prefix in self.__prefixes.pop(handler, ()):
+            t_node = self.__root
+            for t_part in t_prefix.split(".") if t_prefix else ():
+                t_node = t_node.children[t_part]
+            t_node.handlers.remove(handler)
+
+    def __resolve(self, name: str) -> tuple[_InstrumentedHandler, ...]:
+        with self.__routes_lock:
+            t_node: Optional[_RouteNode] = self.__root
+            t_handlers: list[_InstrumentedHandler] = []
+            for t_part in [""] + name.split("."):
+                if t_part:
+                    t_node = t_node.children.get(t_part) if t_node != None else None
+                if t_node == None:
+                    break
+                t_handlers.extend(t_node.handlers)
+            t_handlers.sort(key=self.__order.__getitem__)
+            t_routes = tuple(dict.fromkeys(t_handlers))
+            self.__routes[name] = t_routes
+            return t_routes
+
+    def handle(self, record: logging.LogRecord) -> bool:  # type:ignore
+        t_routes = self.__routes.get(record.name)
+        if t_routes == None:
+            t_routes = self.__resolve(record.name)
+        for h in t_routes:
+            h.handle(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+
+
+class _StreamHandler(_InstrumentedHandler, logging.StreamHandler):  # type:ignore
+    stream: _StreamBase
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            t_text = self.format(record) + self.terminator
+            self.stream.write(t_text)
+            self.flush()
+            self.bytes_written += len(t_text)
+            self.stream._record_written(record)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class _QueuedStreamHandler(_StreamHandler):
+    """callers only enqueue records, a writer thread formats and writes them in batches"""
+
+    def __init__(self, stream: _StreamBase, *, queue_size: int, backpressure: BACKPRESSURE, drop_below_level: LOG_LEVEL):
+        # bytes_written is counted by the writer thread under this lock (not the handler lock, a blocked caller holds that
+        # while it waits for the writer), created first because the base class resets the counters
+        self.__condition = Condition()
+        super().__init__(stream)
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.__queue: deque[logging.LogRecord] = deque()
+        self.__queue_size = queue_size
+        self.__backpressure = backpressure
+        self.__drop_below_level = drop_below_level.value
+        self.__busy = False
+        self.__closing = False
+        self.__dropped = 0
+        self.__writer = Thread(target=self.__writer_loop, name="logger-writer", daemon=True)
+        self.__writer.start()
+
+    def reset_stats(self) -> None:
+        with self.__condition:
+            super().reset_stats()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.__queue)
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            t_record = self.__prepare(record)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+            return
+        with self.__condition:
+            if self.__closing:
+                super().emit(t_record)
+                return
+            while len(self.__queue) >= self.__queue_size:
+                if self.__backpressure == BACKPRESSURE.DROP_OLDEST:
+                    self.__queue.popleft()
+                    self.__dropped += 1
+                elif self.__backpressure == BACKPRESSURE.DROP_BELOW_LEVEL and record.levelno < self.__drop_below_level:
+                    self.__dropped += 1
+                    return
+                else:
+                    self.__condition.wait()
+            self.__queue.append(t_record)
+            self.__condition.notify_all()
+
+    def __prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """copy of record with the message and the exception text rendered now (like logging.handlers.QueueHandler.prepare),
+        so the writer thread sees the args as they were at the call and the queue keeps no tracebacks alive"""
+        _resolve_lazy_args(record)
+        t_record = copy(record)
+        t_record.message = record.getMessage()
+        t_record.msg = t_record.message
+        t_record.args = None
+        if record.exc_info:
+            t_record.exc_text = self.formatter._exc_text(record)  # type:ignore
+        t_record.exc_info = None
+        return t_record
+
+    def __writer_loop(self) -> None:
+        while True:
+            with self.__condition:
+                while not self.__queue and not self.__closing:
+                    self.__condition.wait()
+                if not self.__queue:
+                    return
+                t_batch = [self.__queue.popleft() for _ in range(min(len(self.__queue), _QUEUE_BATCH_SIZE))]
+                self.__busy = True
+                self.__condition.notify_all()
+            t_written = self.__write_batch(t_batch)
+            with self.__condition:
+                self.bytes_written += t_written
+                self.__busy = False
+                self.__condition.notify_all()
+
+    def __write_batch(self, records: list[logging.LogRecord]) -> int:
+        """returnValue: written characters"""
+        t_lines: list[str] = []
+        for r in records:
+            try:
+                t_lines.append(self.format(r) + self.terminator)
+            except Exception:
+                self.handleError(r)
+        if not t_lines:
+            return 0
+        try:
+            t_text = "".join(t_lines)
+            self.stream.write(t_text)
+            self.stream.flush()
+            for r in records:
+                self.stream._record_written(r)
+            return len(t_text)
+        except Exception:
+            self.handleError(records[-1])
+            return 0
+
+    def flush(self) -> None:
+        """blocks until every queued record is written"""
+        if current_thread() is self.__writer:
+            return
+        with self.__condition:
+            while (self.__queue or self.__busy) and self.__writer.is_alive():
+                self.__condition.wait()
+        super().flush()
+
+    def close(self) -> None:
+        with self.__condition:
+            self.__closing = True
+            self.__condition.notify_all()
+        if current_thread() is not self.__writer:
+            self.__writer.join()
+        super().close()
+
+
+class _BinaryHandler(_InstrumentedHandler):
+    formatter: _Formatter
+
+    def __init__(self, file: BinaryLogFile):
+        super().__init__()
+        self.file = file
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            t_exc_text = None
+            if record.exc_info and self.formatter.handle_exec_info:
+                if not record.exc_text:
+                    record.exc_text = self.formatter.formatException(record.exc_info)
+                t_exc_text = record.exc_text
+            self.bytes_written += self.file.write_record(record, t_exc_text, record.__dict__.get(_RAW_RECORD, False))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        if not self.file.closed:
+            self.file.flush()
+
+
+class _FlightRecord():
+    __slots__ = ("created", "msecs", "levelno", "levelname", "name", "msg", "args", "exc_info", "process", "threadName", "raw")
+
+    def __init__(self):
+        self.created = 0.0
+
+
+class _FlightRecorder(_InstrumentedHandler):
+    formatter: _Formatter
+
+    def __init__(self, crash_log: CrashLogFile, capacity: int, max_age_s: Optional[float], trigger_level: LOG_LEVEL):
+        super().__init__()
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.crash_log = crash_log
+        self.__ring = [_FlightRecord() for _ in range(capacity)]
+        self.__next = 0
+        self.__count = 0
+        self.__max_age_s = max_age_s
+        self.__trigger_level = trigger_level.value
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno >= self.__trigger_level:
+            try:
+                self.__dump(record)
+            except Exception:
+                self.handleError(record)
+            return
+        t_entry = self.__ring[self.__next]
+        t_entry.created = record.created
+        t_entry.msecs = record.msecs
+        t_entry.levelno = record.levelno
+        t_entry.levelname = record.levelname
+        t_entry.name = record.name
+        t_entry.msg = record.msg
+        t_entry.args = record.args
+        t_entry.exc_info = record.exc_info
+        t_entry.process = record.process
+        t_entry.threadName = record.threadName
+        t_entry.raw = record.__dict__.get(_RAW_RECORD, False)
+        self.__next = (self.__next + 1) % len(self.__ring)
+        self.__count = min(self.__count + 1, len(self.__ring))
+
+    def __dump(self, trigger: logging.LogRecord) -> None:
+        t_min_created = trigger.created - self.__max_age_s if self.__max_age_s != None else float("-inf")
+        t_lines: list[str] = []
+        for i in range(self.__next - self.__count, self.__next):
+            t_entry = self.__ring[i % len(self.__ring)]
+            if t_entry.created < t_min_created:
+                continue
+            t_record = logging.makeLogRecord({k: getattr(t_entry, k) for k in _FlightRecord.__slots__ if k != "raw"})
+            if t_entry.raw:
+                t_record.__dict__[_RAW_RECORD] = True
+            t_lines.append(self.format(t_record) + "\n")
+            t_entry.exc_info = t_entry.args = t_entry.msg = None
+        t_lines.append(self.format(trigger) + "\n")
+        self.__count = 0
+        t_text = "".join(t_lines)
+        self.crash_log.write(t_text)
+        self.bytes_written += len(t_text)
+        self.crash_log.flush()
+
+    def flush(self) -> None:
+        self.crash_log.flush()
+
+
+class _CollectorClient(_InstrumentedHandler):
+    """formats records on the caller's thread and ships them in batches to a LogCollector from a sender thread
+    at most queue_size records wait for the sender (callers block), once the connection failed records are dropped"""
+
+    def __init__(self, address: Any, authkey: Optional[bytes], batch_size: int, flush_interval_s: float, queue_size: int):
+        super().__init__()
+        if queue_size < batch_size:
+            raise ValueError("queue_size must be at least batch_size")
+        from multiprocessing.connection import Client
+        self.address = address
+        self.__connection = Client(address, authkey=_collector_authkey(authkey))
+        self.__batch: list[str] = []
+        self.__batch_size = batch_size
+        self.__queue_size = queue_size
+        self.__flush_interval_s = flush_interval_s
+        self.__condition = Condition()
+        self.__busy = False
+        self.__closing = False
+        self.__failed = False
+        self.__dropped = 0
+        self.__sender = Thread(target=self.__sender_loop, name="logger-collector-client", daemon=True)
+        self.__sender.start()
+        _collector_clients.add(self)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.__failed or self.__closing:
+            with self.__condition:
+                self.__dropped += 1
+            return
+        try:
+            t_text = self.format(record) + "\n"
+        except Exception:
+            self.handleError(record)
+            return
+        with self.__condition:
+            while len(self.__batch) >= self.__queue_size and not self.__failed:
+                self.__condition.wait()
+            if self.__failed or self.__closing:
+                self.__dropped += 1
+                return
+            self.__batch.append(t_text)
+            self.bytes_written += len(t_text)
+            if len(self.__batch) >= self.__batch_size:
+                self.__condition.notify_all()
+
+    def __sender_loop(self) -> None:
+        while True:
+            with self.__condition:
+                if not self.__closing and len(self.__batch) < self.__batch_size:
+                    self.__condition.wait(self.__flush_interval_s)
+                t_batch, self.__batch = self.__batch, []
+                t_closing = self.__closing
+                self.__busy = bool(t_batch)
+                self.__condition.notify_all()
+            if t_batch:
+                try:
+                    self.__connection.send_bytes("".join(t_batch).encode("utf-8", errors="replace"))
+                except OSError as e:
+                    stderr.write(f"logger collector connection failed: {type(e).__name__}: {e}\n")
+                    with self.__condition:
+                        self.__failed = True
+                        self.__dropped += len(t_batch) + len(self.__batch)
+                        self.__batch = []
+                    t_closing = True
+            with self.__condition:
+                self.__busy = False
+                self.__condition.notify_all()
+            if t_closing:
+                self.__connection.close()
+                return
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.__batch)
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    def flush(self) -> None:
+        """blocks until every record was sent"""
+        with self.__condition:
+            self.__condition.notify_all()
+            while (self.__batch or self.__busy) and self.__sender.is_alive():
+                self.__condition.wait()
+
+    def close(self) -> None:
+        with self.__condition:
+            t_report = not self.__closing and self.__dropped
+            self.__closing = True
+            self.__condition.notify_all()
+        self.__sender.join()
+        if t_report:
+            stderr.write(f"logger collector client dropped {self.__dropped} records\n")
+        super().close()
+
+
 class Handler:
-    def __init__(self, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
-        self._handler = getattr(self, "_handler", logging.Handler())
+    def __init__(self, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, logger_names: Optional[tuple[str, ...] | str] = None):
+        self._handler: _InstrumentedHandler = getattr(self, "_handler", _InstrumentedHandler())
         self.__max_loglevel_filter = _MaxLogLevelFilter()
         self._handler.addFilter(self.__max_loglevel_filter)
+        self.__raw_formatter = logging.Formatter("%(message)s")
         _handler.append(self)
         self.__attached = True
-        self.__handle_exec_info = True
+        self.__enabled = False
+        self.__logger_names = _logger_names_tuple(logger_names)
+        self.__traceback_refs = False
         self.handle_exec_info = handle_exec_info
-        self.enabled = True
         self.log_level = log_level
+        self.enabled = True
         self.max_log_level = max_log_level
         self.formatter = format
 
@@ -239,6 +1418,8 @@ class Handler:
         self.enabled = False
         _handler.remove(self)
         self.__attached = False
+        self._handler.close()
+        _update_min_log_level()
 
     def __check_attached(self):
         if not self.__attached:
@@ -253,9 +1434,22 @@ class Handler:
         self.__check_attached()
         self.__enabled = value
         if value:
-            logging.getLogger().addHandler(self._handler)
+            _router.add(self._handler, self.__logger_names)
         else:
-            logging.getLogger().removeHandler(self._handler)
+            _router.remove(self._handler)
+        _update_min_log_level()
+
+    @property
+    def logger_names(self) -> Optional[tuple[str, ...]]:
+        """the handler only receives records of these loggers and their children (e.g. "app.db" also gets "app.db.pool"), None: all loggers
+        "root" is the root logger (Logger("")), a single name may be given as str"""
+        return self.__logger_names
+
+    @logger_names.setter
+    def logger_names(self, value: Optional[tuple[str, ...] | str]) -> None:
+        self.__logger_names = _logger_names_tuple(value)
+        if self.__enabled:
+            _router.add(self._handler, self.__logger_names)
 
     @property
     def log_level(self) -> LOG_LEVEL:
@@ -264,7 +1458,8 @@ class Handler:
     @log_level.setter
     def log_level(self, level: LOG_LEVEL) -> None:
         self.__log_level = level
-        self._handler.setLevel(level.value)
+        self._handler.threshold = level.value
+        _update_min_log_level()
 
     @property
     def max_log_level(self) -> LOG_LEVEL:
@@ -282,104 +1477,255 @@ class Handler:
     @formatter.setter
     def formatter(self, format: str) -> None:
         self.__format = format
-        self._handler.setFormatter(logging.Formatter(self.__format))
+        t_formatter = self._create_formatter(self.__format, self.__raw_formatter, self.__handle_exec_info)
+        t_formatter.traceback_refs = self.__traceback_refs
+        self._handler.setFormatter(t_formatter)
+
+    def _create_formatter(self, format: str, raw_formatter: logging.Formatter, handle_exec_info: bool) -> _Formatter:
+        return _Formatter(format, raw_formatter, handle_exec_info)
+
+    @property
+    def stats(self) -> HandlerStats:
+        t_handler = self._handler
+        with t_handler.lock:
+            return HandlerStats(self, t_handler.accepted, t_handler.filtered, t_handler.bytes_written, tuple(t_handler.latency_histogram),
+                                t_handler.queue_depth, t_handler.dropped)
+
+    def reset_stats(self) -> None:
+        with self._handler.lock:
+            self._handler.reset_stats()
 
     @property
     def handle_exec_info(self) -> bool:
         return self.__handle_exec_info
 
-    def __handler_emit_without_exec_info(self, record: logging.LogRecord):
-        record.exc_info = None
-        record.exc_text = None
-        self.__handler_emit(record)
-
     @handle_exec_info.setter
     def handle_exec_info(self, value: bool):
-        if self.__handle_exec_info == value:
-            return
         self.__handle_exec_info = value
-        if not value:
-            self.__handler_emit = self._handler.emit
-            self._handler.emit = self.__handler_emit_without_exec_info
-        else:
-            self._handler.emit = self.__handler_emit
-            del self.__handler_emit
+        if isinstance(self._handler.formatter, _Formatter):
+            self._handler.formatter.handle_exec_info = value
+
+    @property
+    def traceback_refs(self) -> bool:
+        """True: a traceback this handler has already written is replaced by a short reference id and the exception line"""
+        return self.__traceback_refs
+
+    @traceback_refs.setter
+    def traceback_refs(self, value: bool):
+        self.__traceback_refs = value
+        if isinstance(self._handler.formatter, _Formatter):
+            self._handler.formatter.traceback_refs = value
 
 
 class _StreamHandlerBase(Handler):
-    def __init__(self, stream: _StreamBase, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
-        self._handler = logging.StreamHandler(stream)
-        super().__init__(log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+    def __init__(self, stream: _StreamBase, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, logger_names: Optional[tuple[str, ...] | str] = None, queued: bool = False, queue_size: int = 10000, backpressure: BACKPRESSURE = BACKPRESSURE.BLOCK, drop_below_level: LOG_LEVEL = LOG_LEVEL.WARNING):
+        """queued=True: records are written by a background thread, if the queue (queue_size) is full the backpressure policy decides:
+        BLOCK waits for free space, DROP_OLDEST discards the oldest queued record, DROP_BELOW_LEVEL discards new records below drop_below_level (others wait)"""
+        if queued:
+            self._handler = _QueuedStreamHandler(stream, queue_size=queue_size, backpressure=backpressure, drop_below_level=drop_below_level)
+        else:
+            self._handler = _StreamHandler(stream)
+        super().__init__(log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, logger_names=logger_names)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._handler.queue_depth
+
+    @property
+    def dropped(self) -> int:
+        return self._handler.dropped
+
+    def flush(self) -> None:
+        self._handler.flush()
 
 
 class StreamHandler(_StreamHandlerBase):
-    def __init__(self, stream: LogStream, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
-        super().__init__(stream, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+    def __init__(self, stream: LogStream, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, logger_names: Optional[tuple[str, ...] | str] = None):
+        super().__init__(stream, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, logger_names=logger_names)
 
 
 class StdErrHandler(StreamHandler):
-    def __init__(self, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, init_message: bool = True, app_name: str | None = None, init_message_suffix: str = ""):
+    def __init__(self, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, logger_names: Optional[tuple[str, ...] | str] = None, init_message: bool = True, app_name: str | None = None, init_message_suffix: str = ""):
         super().__init__(LogStream(stderr, init_message=init_message,
-                                   app_name=app_name, init_message_suffix=init_message_suffix), log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+                                   app_name=app_name, init_message_suffix=init_message_suffix), log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, logger_names=logger_names)
 
 
 class FileHandler(_StreamHandlerBase):
-    def __init__(self, file: LogFile | LogFileOnDemand | CrashLogFile, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
-        super().__init__(file, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+    def __init__(self, file: LogFile | LogFileOnDemand | CrashLogFile, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, logger_names: Optional[tuple[str, ...] | str] = None, queued: bool = False, queue_size: int = 10000, backpressure: BACKPRESSURE = BACKPRESSURE.BLOCK, drop_below_level: LOG_LEVEL = LOG_LEVEL.WARNING, structured: bool = False, extra_fields: tuple[str, ...] = ()):
+        """structured=True: writes one JSON object per line instead of format (fields: time, level, name, message, exc, stack and
+        the LogRecord attributes named in extra_fields, set them per call with Logger.info(..., extra={...})), use LogFile(init_message=False, blank_lines=0) for a pure JSON lines file
+        and logreader.read_json_log to read it"""
+        self.__structured = structured
+        self.__extra_fields = extra_fields
+        super().__init__(file, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, logger_names=logger_names,
+                         queued=queued, queue_size=queue_size, backpressure=backpressure, drop_below_level=drop_below_level)
+
+    def _create_formatter(self, format: str, raw_formatter: logging.Formatter, handle_exec_info: bool) -> _Formatter:
+        if self.__structured:
+            return _JsonFormatter(self.__extra_fields, raw_formatter, handle_exec_info)
+        return super()._create_formatter(format, raw_formatter, handle_exec_info)
+
+
+class BinaryFileHandler(Handler):
+    def __init__(self, file: BinaryLogFile, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, handle_exec_info: bool = True, logger_names: Optional[tuple[str, ...] | str] = None):
+        self._handler = _BinaryHandler(file)
+        super().__init__(log_level, max_log_level=max_log_level, handle_exec_info=handle_exec_info, logger_names=logger_names)
+
+
+class FlightRecorderHandler(Handler):
+    def __init__(self, crash_log: CrashLogFile, log_level: LOG_LEVEL = LOG_LEVEL.DEBUG, *, capacity: int = 1000, max_age_s: Optional[float] = None, trigger_level: LOG_LEVEL = LOG_LEVEL.ERROR, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, logger_names: Optional[tuple[str, ...] | str] = None):
+        """keeps the last capacity records (not older than max_age_s) unformatted in memory,
+        a record with trigger_level or higher writes them together with the record itself into crash_log"""
+        self._handler = _FlightRecorder(crash_log, capacity, max_age_s, trigger_level)
+        super().__init__(log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, logger_names=logger_names)
+
+
+class CollectorHandler(Handler):
+    def __init__(self, address: Any, log_level: LOG_LEVEL, *, authkey: Optional[bytes] = None, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, logger_names: Optional[tuple[str, ...] | str] = None, batch_size: int = 256, flush_interval_s: float = 0.1, queue_size: int = 10000):
+        """sends the formatted records to the LogCollector at address (LogCollector.address),
+        records are sent in batches of batch_size or after flush_interval_s at the latest
+        logging blocks while queue_size records are waiting, after the connection failed records are dropped (stats.dropped)"""
+        self._handler = _CollectorClient(address, authkey, batch_size, flush_interval_s, queue_size)
+        super().__init__(log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, logger_names=logger_names)
+
+    def flush(self) -> None:
+        self._handler.flush()
 
 
 class MSGBoxHandler(_StreamHandlerBase):
-    def __init__(self, stream: MSGBoxStream, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "%(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True):
-        super().__init__(stream, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info)
+    def __init__(self, stream: MSGBoxStream, log_level: LOG_LEVEL, *, max_log_level: LOG_LEVEL = LOG_LEVEL.CRITICAL, format: str = "%(name)s - %(levelname)s: %(message)s", handle_exec_info: bool = True, logger_names: Optional[tuple[str, ...] | str] = None):
+        super().__init__(stream, log_level, max_log_level=max_log_level, format=format, handle_exec_info=handle_exec_info, logger_names=logger_names)
 
     def join_threads(self):
-        from utility import msgbox
-        msgbox.join_threads()
+        self._handler.stream.join()
+
+
+class DuplicateSuppressor():
+    def __init__(self, handler: Handler, *, window_s: float = 5.0, max_fingerprints: int = 1024):
+        """wraps handler: records with the same logger, level and message template are emitted only once per window_s,
+        the suppressed ones are reported as a "repeated N times" record when the window has ended, when the fingerprint
+        is evicted from the max_fingerprints most recently used fingerprints, on flush() and at exit"""
+        self.__handler = handler
+        self.__filter = _DuplicateFilter(handler, window_s, max_fingerprints)
+        handler._handler.addFilter(self.__filter)
+        _duplicate_filters.add(self.__filter)
+
+    @property
+    def handler(self) -> Handler:
+        return self.__handler
+
+    def flush(self) -> None:
+        self.__filter.flush()
+
+    def remove(self) -> None:
+        """reports all suppressed records and unwraps the handler"""
+        _duplicate_filters.discard(self.__filter)
+        self.__filter.cancel()
+        self.__filter.flush()
+        self.__handler._handler.removeFilter(self.__filter)
+
+
+class LogCollector():
+    def __init__(self, file_path: str, *, authkey: Optional[bytes] = None, blank_lines: int = 3, init_message: bool = True, app_name: Optional[str] = None, init_message_suffix: str = "", clear_logfile: bool = False, sync_policy: Optional[SyncPolicy] = None, rotation: Optional[RotationPolicy] = None):
+        """collector process owning the LogFile at file_path, CollectorHandler instances of any number of processes write into it
+        records are written in the order they arrive, authkey defaults to the multiprocessing authkey (inherited by child processes)
+        the collector is stopped at exit, it also stops if this process dies"""
+        self.__file_path = convert_relpath_to_script_abspath(file_path)
+        self.__authkey = authkey
+        self.__logfile_kwargs: dict[str, Any] = {"blank_lines": blank_lines, "init_message": init_message, "app_name": app_name,
+                                                 "init_message_suffix": init_message_suffix, "clear_logfile": clear_logfile,
+                                                 "sync_policy": sync_policy, "rotation": rotation}
+        self.__process: Any = None
+        self.__control: Any = None
+        self.__address: Any = None
+
+    def start(self) -> None:
+        from multiprocessing import Pipe, Process
+        self.__control, t_child_control = Pipe()
+        self.__process = Process(target=_run_log_collector, args=(t_child_control, self.__control, self.__file_path, _collector_authkey(self.__authkey), self.__logfile_kwargs),
+                                 name="logger-collector", daemon=True)
+        self.__process.start()
+        t_child_control.close()
+        t_result = self.__control.recv()
+        if isinstance(t_result, BaseException):
+            self.__process.join()
+            raise t_result
+        self.__address = t_result
+        atexit.register(self.stop)
+
+    @property
+    def address(self) -> Any:
+        if self.__address == None:
+            raise InternalError("collector is not running")
+        return self.__address
+
+    def stop(self) -> None:
+        """writes everything received so far and ends the collector process"""
+        if self.__process == None:
+            return
+        atexit.unregister(self.stop)
+        # the clients of this process send what they hold and disconnect first, stop may run (at exit) before logging.shutdown
+        for c in list(_collector_clients):
+            if c.address == self.__address:
+                c.close()
+        try:
+            self.__control.send(None)
+        except OSError:  # the collector process is already gone
+            pass
+        self.__process.join()
+        self.__control.close()
+        self.__process = self.__control = self.__address = None
 
 
 class Logger:
+    """log_objs may contain Lazy values, which are only evaluated if a handler emits the record
+    extra: attributes set on the record (like logging's extra), e.g. for the extra_fields of a structured FileHandler"""
+
     def __init__(self, name: str):
         self.__logger = logging.getLogger(name)
 
-    def debug(self, *log_objs: object) -> None:
+    def debug(self, *log_objs: object, extra: Optional[dict[str, Any]] = None) -> None:
+        if logging.DEBUG < _min_log_level:
+            return
         _check_has_handler()
-        self.__logger.debug(*log_objs)
+        self.__logger.debug(*log_objs, extra=extra)
 
-    def info(self, *log_objs: object) -> None:
+    def info(self, *log_objs: object, extra: Optional[dict[str, Any]] = None) -> None:
+        if logging.INFO < _min_log_level:
+            return
         _check_has_handler()
-        self.__logger.info(*log_objs)
+        self.__logger.info(*log_objs, extra=extra)
 
-    def warning(self, *log_objs: object) -> None:
+    def warning(self, *log_objs: object, extra: Optional[dict[str, Any]] = None) -> None:
+        if logging.WARNING < _min_log_level:
+            return
         _check_has_handler()
-        self.__logger.warning(*log_objs)
+        self.__logger.warning(*log_objs, extra=extra)
 
-    def error(self, *log_objs: object) -> None:
+    def error(self, *log_objs: object, extra: Optional[dict[str, Any]] = None) -> None:
+        if logging.ERROR < _min_log_level:
+            return
         _check_has_handler()
-        self.__logger.error(*log_objs)
+        self.__logger.error(*log_objs, extra=extra)
 
-    def critical(self, *log_objs: object) -> None:
+    def critical(self, *log_objs: object, extra: Optional[dict[str, Any]] = None) -> None:
+        if logging.CRITICAL < _min_log_level:
+            return
         _check_has_handler()
-        self.__logger.critical(*log_objs)
+        self.__logger.critical(*log_objs, extra=extra)
 
-    def exception(self, *log_objs: object) -> None:
+    def exception(self, *log_objs: object, extra: Optional[dict[str, Any]] = None) -> None:
+        if logging.CRITICAL < _min_log_level:
+            return
         _check_has_handler()
-        self.__logger.critical(*log_objs, exc_info=True)
+        self.__logger.critical(*log_objs, exc_info=True, extra=extra)
 
-    def print(self, *log_objs: object, simulated_loglevel: LOG_LEVEL = LOG_LEVEL.CRITICAL) -> None:
+    def print(self, *log_objs: object, simulated_loglevel: LOG_LEVEL = LOG_LEVEL.CRITICAL, extra: Optional[dict[str, Any]] = None) -> None:
         """Send log_objs to all handlers without formatting."""
+        if simulated_loglevel.value < _min_log_level:
+            return
         _check_has_handler()
-
-        handlers: dict[logging.Handler, logging.Formatter | None] = {}
-
-        for handler in logging.getLogger().handlers:
-            formatter = handler.formatter
-            handler.setFormatter(logging.Formatter("%(message)s"))
-            handlers[handler] = formatter
-
-        self.__logger.log(simulated_loglevel.value, *log_objs)
-
-        for handler, formatter in handlers.items():
-            handler.setFormatter(formatter)
+        self.__logger.log(simulated_loglevel.value, *log_objs, extra=_RAW_EXTRA if extra == None else {**extra, **_RAW_EXTRA})
 
     @property
     def disabled(self) -> bool:
@@ -392,14 +1738,289 @@ class Logger:
 
 # Modulemethods:
 
+def _finish_rotated_segment(file_path: str, segment_path: str, rotation: RotationPolicy) -> None:
+    if rotation.compression != COMPRESSION.NONE:
+        if rotation.compression == COMPRESSION.GZIP:
+            import gzip
+            t_path, t_open = f"{segment_path}.gz", gzip.open
+        else:
+            import lzma
+            t_path, t_open = f"{segment_path}.xz", lzma.open
+        with open(segment_path, "rb") as src, t_open(f"{t_path}.tmp", "wb") as dst:
+            copyfileobj(src, dst, 1 << 20)
+        rename(f"{t_path}.tmp", t_path)
+        remove(segment_path)
+        if path.exists(f"{segment_path}.idx"):  # the offsets do not apply to the compressed segment
+            remove(f"{segment_path}.idx")
+
+    if rotation.max_segments == None and rotation.max_total_bytes == None:
+        return
+    t_segments = _find_rotated_segments(file_path)
+    t_sizes = [path.getsize(p) for p in t_segments]
+    t_total = sum(t_sizes)
+    for i, p in enumerate(t_segments):
+        t_count = len(t_segments) - i
+        if (rotation.max_segments == None or t_count <= rotation.max_segments) and (rotation.max_total_bytes == None or t_total <= rotation.max_total_bytes):
+            break
+        remove(p)
+        if path.exists(f"{p}.idx"):
+            remove(f"{p}.idx")
+        t_total -= t_sizes[i]
+
+
+def _find_rotated_segments(file_path: str) -> list[str]:
+    """rotated segments of file_path, oldest first"""
+    t_root, t_ext = path.splitext(file_path)
+    t_pattern = re.compile(rf"{re.escape(t_root)}\.(\d{{8}}-\d{{6}})(?:-(\d+))?{re.escape(t_ext)}(?:\.gz|\.xz)?")
+    t_segments: list[tuple[str, int, str]] = []
+    for p in glob(f"{escape(t_root)}.[0-9]*"):
+        if (t_match := t_pattern.fullmatch(p)) != None:
+            t_segments.append((t_match[1], int(t_match[2] or 1), p))
+    t_segments.sort()
+    return [p for _, _, p in t_segments]
+
+
+def get_handler_stats() -> list[HandlerStats]:
+    """snapshots of the counters of all attached handlers"""
+    return [h.stats for h in list(_handler)]
+
+
+def _logger_names_tuple(logger_names: Optional[tuple[str, ...] | str]) -> Optional[tuple[str, ...]]:
+    # a bare str would otherwise be split into its characters
+    if logger_names == None:
+        return None
+    return (logger_names,) if isinstance(logger_names, str) else tuple(logger_names)
+
+
+def _flush_duplicate_filters() -> None:
+    for f in list(_duplicate_filters):
+        if f.handler.attached:
+            f.flush()
+
+
+def _update_min_log_level() -> None:
+    """caches the lowest log level of all enabled handlers, has to be called whenever enabled, log_level or the handler list change"""
+    global _min_log_level, _has_enabled_handler, _no_handlers_warning_issued
+    t_levels = [h.log_level.value for h in _handler if h.enabled]
+    _has_enabled_handler = len(t_levels) > 0
+    if _has_enabled_handler:
+        _no_handlers_warning_issued = False
+        _min_log_level = min(t_levels)
+    else:
+        # let calls through, so _check_has_handler can warn
+        _min_log_level = LOG_LEVEL.NOTSET.value
+
+
+def _compile_format(fmt: str) -> Optional[Callable[[dict[str, Any]], str]]:
+    """compiles a %-style format string into a function rendering a record dict, None if the format is not supported"""
+    t_parts: list[str] = []
+    t_literal = ""
+    t_pos = 0
+    for t_match in _FORMAT_TOKEN.finditer(fmt):
+        if "%" in fmt[t_pos:t_match.start()]:
+            return None
+        t_literal += fmt[t_pos:t_match.start()]
+        t_pos = t_match.end()
+        if t_match[0] == "%%":
+            t_literal += "%"
+            continue
+        if t_literal:
+            t_parts.append(repr(t_literal))
+            t_literal = ""
+        t_key, t_spec = t_match["key"], t_match["spec"]
+        if t_spec == "s":
+            t_parts.append(f'f"{{d[{t_key!r}]!s}}"')
+        else:
+            t_parts.append(f'f"{{{("%" + t_spec)!r} % (d[{t_key!r}],)}}"')
+    if "%" in fmt[t_pos:]:
+        return None
+    t_literal += fmt[t_pos:]
+    if t_literal:
+        t_parts.append(repr(t_literal))
+    # adjacent (f-)string literals are compiled into a single f-string
+    return eval(f"lambda d: {' '.join(t_parts) if t_parts else repr('')}", {"__builtins__": {}})
+
+
+def _collector_authkey(authkey: Optional[bytes]) -> bytes:
+    if authkey != None:
+        return authkey
+    from multiprocessing import current_process
+    return bytes(current_process().authkey)
+
+
+def _run_log_collector(control: Any, parent_control: Any, file_path: str, authkey: bytes, logfile_kwargs: dict[str, Any]) -> None:
+    from multiprocessing.connection import Client, Connection, Listener
+    # only the parent may hold its end of the pipe, otherwise control.recv never sees the parent dying
+    parent_control.close()
+    try:
+        t_logfile = LogFile(file_path, **logfile_kwargs)
+        t_listener = Listener(authkey=authkey)
+    except Exception as e:
+        control.send(e)
+        return
+    t_queue: Queue[Optional[bytes]] = Queue()
+    t_stopping = False
+
+    def receive(connection: Connection) -> None:
+        # after the stop request the connection is still read until it is closed or idle for _COLLECTOR_DRAIN_S
+        with connection:
+            try:
+                while True:
+                    if connection.poll(_COLLECTOR_DRAIN_S):
+                        t_queue.put(connection.recv_bytes())
+                    elif t_stopping:
+                        return
+            except (EOFError, OSError):
+                pass
+
+    def accept() -> None:
+        while True:
+            try:
+                t_connection = t_listener.accept()
+            except Exception:
+                if t_stopping:
+                    return
+                continue
+            if t_stopping:
+                t_connection.close()
+                return
+            t_receivers.append(Thread(target=receive, args=(t_connection,), daemon=True))
+            t_receivers[-1].start()
+
+    def write() -> None:
+        while (t_data := t_queue.get()) != None:
+            t_logfile.write(t_data.decode("utf-8", errors="replace"))
+
+    t_receivers: list[Thread] = []
+    t_accepter = Thread(target=accept, daemon=True)
+    t_accepter.start()
+    t_writer = Thread(target=write)
+    t_writer.start()
+    control.send(t_listener.address)
+    try:
+        control.recv()
+    except (EOFError, OSError):
+        # the parent process died without calling stop, write what was received and end too
+        pass
+
+    t_stopping = True
+    with Client(t_listener.address, authkey=authkey):
+        pass
+    t_accepter.join()
+    t_listener.close()
+    for r in t_receivers:
+        r.join()
+    t_queue.put(None)
+    t_writer.join()
+    t_logfile.close()
+
+
+def _format_exception_cached(exc: Optional[BaseException]) -> Optional[tuple[str, str, str]]:
+    """text like logging.Formatter.formatException, reference id and exception line(s) of the newest exception,
+    the frames are rendered once per fingerprint (type and code / line chain of the exception and its causes / contexts),
+    only the exception lines are rendered every time, None for exception groups (not cached)"""
+    if exc == None:
+        return None
+    t_chain: list[tuple[BaseException, str]] = []
+    t_seen: set[int] = set()
+    t_link = ""
+    t_exc: Optional[BaseException] = exc
+    while t_exc != None and id(t_exc) not in t_seen:
+        if isinstance(t_exc, _EXCEPTION_GROUP):
+            return None
+        t_seen.add(id(t_exc))
+        t_chain.append((t_exc, t_link))
+        if t_exc.__cause__ != None:
+            t_exc, t_link = t_exc.__cause__, _CAUSE_MESSAGE
+        elif t_exc.__context__ != None and not t_exc.__suppress_context__:
+            t_exc, t_link = t_exc.__context__, _CONTEXT_MESSAGE
+        else:
+            t_exc = None
+    t_chain.reverse()  # oldest first, each followed by its link to the next one
+
+    t_key = tuple((type(e), link, tuple((tb.tb_frame.f_code, tb.tb_lineno, tb.tb_lasti) for tb in _walk_tb_objects(e.__traceback__))) for e, link in t_chain)
+    with _traceback_cache_lock:
+        t_cached = _traceback_cache.get(t_key)
+        if t_cached != None:
+            _traceback_cache.move_to_end(t_key)
+    if t_cached == None:
+        t_frames = tuple("" if e.__traceback__ == None else "Traceback (most recent call last):\n" + "".join(extract_tb(e.__traceback__).format())
+                         for e, _ in t_chain)
+        t_cached = (t_frames, f"{crc32(repr([(t.__module__, t.__qualname__, l, [(c.co_filename, c.co_name, n, i) for c, n, i in f]) for t, l, f in t_key]).encode()):08x}")
+        with _traceback_cache_lock:
+            _traceback_cache[t_key] = t_cached
+            if len(_traceback_cache) > _TRACEBACK_CACHE_SIZE:
+                _traceback_cache.popitem(last=False)
+
+    t_frames, t_ref = t_cached
+    t_parts: list[str] = []
+    for (e, link), frames in zip(t_chain, t_frames):
+        t_parts.append(frames)
+        t_exception_only = "".join(format_exception_only(type(e), e))
+        t_parts.append(t_exception_only)
+        t_parts.append(link)
+    t_text = "".join(t_parts)
+    return (t_text[:-1] if t_text[-1:] == "\n" else t_text), t_ref, t_exception_only.rstrip("\n")
+
+
+def _walk_tb_objects(tb: Any) -> Any:
+    while tb != None:
+        yield tb
+        tb = tb.tb_next
+
+
+def _show_msg_box(title: str, text: str) -> None:
+    from utility import msgbox
+    msgbox.create_msg_box(title, text, msgbox.BUTTON_STYLES.OK)
+
+
+def _pack_binary_args(args: Any) -> Optional[bytes]:
+    """packed args for BinaryLogFile, None if they cannot be stored exactly (then the rendered message is stored)"""
+    if not args:
+        return b""
+    if type(args) != tuple or len(args) > 255:
+        return None
+    t_parts: list[bytes] = []
+    for a in args:
+        t_type = type(a)
+        if t_type == str:
+            t_data = a.encode("utf-8", errors="replace")
+            t_parts += (BIN_ARG_STR, BIN_LENGTH.pack(len(t_data)), t_data)
+        elif t_type == int:
+            if -0x80000000 <= a <= 0x7FFFFFFF:
+                t_parts += (BIN_ARG_INT, BIN_ARG_STRUCTS[BIN_ARG_INT].pack(a))
+            elif -0x8000000000000000 <= a <= 0x7FFFFFFFFFFFFFFF:
+                t_parts += (BIN_ARG_LONG, BIN_ARG_STRUCTS[BIN_ARG_LONG].pack(a))
+            else:
+                return None
+        elif t_type == float:
+            t_parts += (BIN_ARG_FLOAT, BIN_ARG_STRUCTS[BIN_ARG_FLOAT].pack(a))
+        elif t_type == bool:
+            t_parts.append(BIN_ARG_TRUE if a else BIN_ARG_FALSE)
+        elif t_type == type(None):
+            t_parts.append(BIN_ARG_NONE)
+        else:
+            return None
+    return b"".join(t_parts)
+
+
+def _encode_json_value(value: Any) -> str:
+    if isinstance(value, str):
+        return encode_json_string(value)
+    return _json_encoder.encode(value)
+
+
+def _resolve_lazy_args(record: logging.LogRecord) -> None:
+    """replaces the Lazy args of record by their values, so the % formatting only sees concrete values"""
+    t_args = record.args
+    if type(t_args) == tuple and any(type(a) == Lazy for a in t_args):
+        record.args = tuple(a.value if type(a) == Lazy else a for a in t_args)  # type:ignore
+
+
 def _check_has_handler() -> None:
     global _no_handlers_warning_issued
-    t_handler: list[Handler] = _handler
-
-    for h in t_handler:
-        if h.enabled:
-            _no_handlers_warning_issued = False
-            return
+    if _has_enabled_handler:
+        return
 
     if not _no_handlers_warning_issued:
         warnings.warn("Logger hat keine Handler!")
@@ -407,86 +2028,86 @@ def _check_has_handler() -> None:
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[StdErrHandler, MSGBoxHandler, FileHandler, FileHandler]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[StdErrHandler, MSGBoxHandler, FileHandler, FileHandler]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[StdErrHandler, MSGBoxHandler, FileHandler, None]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[StdErrHandler, MSGBoxHandler, FileHandler, None]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[StdErrHandler, MSGBoxHandler, None, FileHandler]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[StdErrHandler, MSGBoxHandler, None, FileHandler]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[StdErrHandler, MSGBoxHandler, None, None]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[StdErrHandler, MSGBoxHandler, None, None]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[StdErrHandler, None, FileHandler, FileHandler]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[StdErrHandler, None, FileHandler, FileHandler]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[StdErrHandler, None, FileHandler, None]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[StdErrHandler, None, FileHandler, None]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[StdErrHandler, None, None, FileHandler]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[StdErrHandler, None, None, FileHandler]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[StdErrHandler, None, None, None]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[True] = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[StdErrHandler, None, None, None]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[None, MSGBoxHandler, FileHandler, FileHandler]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[None, MSGBoxHandler, FileHandler, FileHandler]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[None, MSGBoxHandler, FileHandler, None]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[None, MSGBoxHandler, FileHandler, None]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[None, MSGBoxHandler, None, FileHandler]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[None, MSGBoxHandler, None, FileHandler]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[None, MSGBoxHandler, None, None]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[True] = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[None, MSGBoxHandler, None, None]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[None, None, FileHandler, FileHandler]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[None, None, FileHandler, FileHandler]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[None, None, FileHandler, None]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[True] = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[None, None, FileHandler, None]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[None, None, None, FileHandler]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[True] = True, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[None, None, None, FileHandler]:
     pass
 
 
 @overload
-def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[None, None, None, None]:
+def use_std_config(*, app_name: str = "APP", use_stderr: Literal[False], stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: Literal[False], msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: Literal[False], logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: Literal[False], logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[None, None, None, None]:
     pass
 
 
-def use_std_config(*, app_name: str = "APP", use_stderr: bool = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: bool = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: bool = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: bool = False, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO) -> tuple[Optional[StdErrHandler], Optional[MSGBoxHandler], Optional[FileHandler], Optional[FileHandler]]:
+def use_std_config(*, app_name: str = "APP", use_stderr: bool = True, stderr_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, use_msgbox: bool = True, msgbox_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_error: bool = True, logfile_error_loglevel: LOG_LEVEL = LOG_LEVEL.WARNING, use_logfile_verbose: bool = False, logfile_verbose_loglevel: LOG_LEVEL = LOG_LEVEL.INFO, logfile_verbose_rotation: Optional[RotationPolicy] = None) -> tuple[Optional[StdErrHandler], Optional[MSGBoxHandler], Optional[FileHandler], Optional[FileHandler]]:
     """returnValue: (stderr_handler: Optional[StdErrHandler], msgbox_handler: Optional[MSGBoxHandler], logfile_error_handler: Optional[FileHandler], logfile_verbose_handler: Optional[FileHandler])
     used file modes: logfile_error_file: LogFileOnDemand, logfile_verbose_file: LogFile"""
 
@@ -502,16 +2123,40 @@ def use_std_config(*, app_name: str = "APP", use_stderr: bool = True, stderr_log
             f"{app_name}_error.log", app_name=app_name), logfile_error_loglevel)
     if use_logfile_verbose:
         t_logfile_verbose_handler = FileHandler(
-            LogFile(f"{app_name}_verbose.log", app_name=app_name), logfile_verbose_loglevel)
+            LogFile(f"{app_name}_verbose.log", app_name=app_name, rotation=logfile_verbose_rotation), logfile_verbose_loglevel)
 
     return t_stderr_handler, t_msgbox_handler, t_logfile_error_handler, t_logfile_verbose_handler
 
 
 # Init:
+_RAW_RECORD = "_logger_raw"
+_RAW_EXTRA = {_RAW_RECORD: True}
+_FORMAT_CACHE = "_logger_formatted"
+_SUMMARY_RECORD = "_logger_summary"
+_json_encoder = JSONEncoder(ensure_ascii=False, default=str)
+_FORMAT_TOKEN = re.compile(r"%%|%\((?P<key>\w+)\)(?P<spec>[#0+ -]*(?:\d+)?(?:\.\d+)?[diouxXeEfFgGcrsa])")
+_QUEUE_BATCH_SIZE = 256
+_COLLECTOR_DRAIN_S = 0.2
+_LATENCY_BUCKETS = 24
+_TRACEBACK_CACHE_SIZE = 256
+_traceback_cache: OrderedDict[Any, tuple[tuple[str, ...], str]] = OrderedDict()
+_traceback_cache_lock = Lock()
+_EXCEPTION_GROUP: Any = getattr(builtins, "BaseExceptionGroup", ())
+_CAUSE_MESSAGE = "\nThe above exception was the direct cause of the following exception:\n\n"
+_CONTEXT_MESSAGE = "\nDuring handling of the above exception, another exception occurred:\n\n"
+_background_worker = _BackgroundWorker()
+# registered after logging, so pending summaries are written before logging.shutdown
+_duplicate_filters: WeakSet[_DuplicateFilter] = WeakSet()
+_collector_clients: WeakSet[_CollectorClient] = WeakSet()
+atexit.register(_flush_duplicate_filters)
 _handler: list[Handler] = []
 _no_handlers_warning_issued = False
+_has_enabled_handler = False
+_min_log_level = LOG_LEVEL.NOTSET.value
 logging.lastResort = logging.StreamHandler(open(devnull, "w"))
 logging.basicConfig(handlers=(), level=LOG_LEVEL.NOTSET.value)
+_router = _Router()
+logging.getLogger().addHandler(_router)
 warnings.filterwarnings("always", ".*", category=UserWarning)
 _start_time = datetime.now()
 
@@ -609,3 +2254,18 @@ if __name__ == "__main__":
         logger.exception("EXCEPTION")
 
     t_msgbox_handler.join_threads()
+
+    # CollectorHandler in the same process without flush or stop, every record has to be in the file at exit
+    t_collector_path = convert_relpath_to_script_abspath("test_collector.log")
+
+    def check_collector() -> None:
+        with open(t_collector_path) as f:
+            t_count = sum(1 for l in f if ": COLLECTOR " in l)
+        assert t_count == 1000, f"collector: only {t_count} of 1000 records written"
+
+    atexit.register(check_collector)  # registered first, so it runs after LogCollector.stop
+    t_collector = lg.LogCollector(t_collector_path, clear_logfile=True, app_name="LOG")
+    t_collector.start()
+    lg.CollectorHandler(t_collector.address, lg.LOG_LEVEL.DEBUG)
+    for i in range(1000):
+        logger.info("COLLECTOR %d", i)
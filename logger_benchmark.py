@@ -0,0 +1,240 @@
+# V1.2
+
+from __future__ import annotations
+from argparse import ArgumentParser
+from datetime import datetime
+from itertools import product
+from json import dump, load
+from os import devnull, path
+from platform import platform, python_version
+from tempfile import TemporaryDirectory
+from threading import Barrier, Thread
+from time import perf_counter, perf_counter_ns
+from typing import Callable, Optional
+import gc
+import logging
+import sys
+import warnings
+
+import logger as lg
+
+
+def bench_logfile_open(sizes: tuple[int, ...] = (0, 1 << 20, 1 << 26, 1 << 30), repeats: int = 20) -> dict[int, float]:
+    """returnValue: {existing log size in bytes: mean seconds to open (and close) a LogFile}"""
+    t_results: dict[int, float] = {}
+    with TemporaryDirectory() as t_dir:
+        for size in sizes:
+            t_path = path.join(t_dir, f"startup_{size}.log")
+            t_total = 0.0
+            for _ in range(repeats):
+                with open(t_path, "w") as f:
+                    f.truncate(size)
+                t_start = perf_counter()
+                t_logfile = lg.LogFile(t_path, app_name="BENCH")
+                t_total += perf_counter() - t_start
+                t_logfile.close()
+            t_results[size] = t_total / repeats
+    return t_results
+
+
+def bench_formatter(records: int = 50000, format: str = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s", repeats: int = 5) -> dict[str, float]:
+    """returnValue: {formatter: mean seconds per record (best of repeats)} for logging.Formatter and the compiled logger formatter"""
+    t_formatters: dict[str, logging.Formatter] = {
+        "logging.Formatter": logging.Formatter(format),
+        "logger._Formatter": lg._Formatter(format, logging.Formatter("%(message)s"), True),
+    }
+    t_results: dict[str, float] = {}
+    for _ in range(repeats):
+        for name, formatter in t_formatters.items():
+            # fresh records for every run, the logger formatter caches its result on the record
+            t_records = [logging.LogRecord("bench", logging.INFO, __file__, 0, "message %d", (i,), None) for i in range(records)]
+            gc.disable()
+            t_start = perf_counter()
+            for r in t_records:
+                formatter.format(r)
+            t_seconds = perf_counter() - t_start
+            gc.enable()
+            t_results[name] = min(t_results.get(name, float("inf")), t_seconds / records)
+    return t_results
+
+
+# Suite:
+# every scenario logs records through lg.Logger from producers threads and measures the wall time and the latency of every call
+# kinds: "filtered" (DEBUG, below every handler level), "emitted" (WARNING, written by every handler), "exception" (Logger.exception)
+# the stderr handler writes to devnull, the log files are created in a temporary directory
+
+KINDS = ("filtered", "emitted", "exception")
+FILE_MODES = ("LogFile", "LogFileOnDemand", "CrashLogFile")
+
+
+def _std_config(directory: str, use_stderr: bool, use_logfile_error: bool, use_logfile_verbose: bool) -> Callable[[], list[lg.Handler]]:
+    def setup() -> list[lg.Handler]:
+        # a fresh devnull for every run, the stderr handler's stream closes its file when it is collected
+        lg.stderr = open(devnull, "w")
+        t_handlers = lg.use_std_config(app_name=path.join(directory, "BENCH"), use_stderr=use_stderr, use_msgbox=False,
+                                       use_logfile_error=use_logfile_error, use_logfile_verbose=use_logfile_verbose)
+        return [h for h in t_handlers if h != None]
+    return setup
+
+
+def _file_mode(directory: str, mode: str) -> Callable[[], list[lg.Handler]]:
+    def setup() -> list[lg.Handler]:
+        if mode == "LogFile":
+            t_file: lg.LogFile | lg.LogFileOnDemand | lg.CrashLogFile = lg.LogFile(path.join(directory, "bench_file.log"))
+        elif mode == "LogFileOnDemand":
+            t_file = lg.LogFileOnDemand(path.join(directory, "bench_ondemand.log"))
+        else:
+            t_file = lg.CrashLogFile(path.join(directory, "bench_crash_"), ".log")
+        return [lg.FileHandler(t_file, lg.LOG_LEVEL.INFO)]
+    return setup
+
+
+def _teardown(handlers: list[lg.Handler]) -> None:
+    for h in handlers:
+        if h.attached:
+            h.detach()
+        t_stream = getattr(h._handler, "stream", None)
+        if isinstance(t_stream, lg._StreamBase) and not isinstance(t_stream, lg.LogStream):
+            try:
+                t_stream.close()
+            except lg.InternalError:  # on demand file that was never opened
+                pass
+
+
+def _produce(log: lg.Logger, kind: str, records: int, latencies: list[int], barrier: Barrier) -> None:
+    t_append = latencies.append
+    barrier.wait()
+    if kind == "filtered":
+        for i in range(records):
+            t_start = perf_counter_ns()
+            log.debug("benchmark record %d", i)
+            t_append(perf_counter_ns() - t_start)
+    elif kind == "emitted":
+        for i in range(records):
+            t_start = perf_counter_ns()
+            log.warning("benchmark record %d", i)
+            t_append(perf_counter_ns() - t_start)
+    else:
+        try:
+            raise ValueError("benchmark failure")
+        except ValueError:
+            for i in range(records):
+                t_start = perf_counter_ns()
+                log.exception("benchmark record %d", i)
+                t_append(perf_counter_ns() - t_start)
+
+
+def run_scenario(setup: Callable[[], list[lg.Handler]], kind: str, threads: int, records: int) -> dict[str, float]:
+    """returnValue: {"throughput": records per second, "p50_us" / "p90_us" / "p99_us" / "max_us": latency of one logging call}"""
+    t_handlers = setup()
+    t_log = lg.Logger("bench")
+    t_latencies: list[list[int]] = [[] for _ in range(threads)]
+    t_barrier = Barrier(threads + 1)
+    t_threads = [Thread(target=_produce, args=(t_log, kind, records // threads, t_latencies[i], t_barrier)) for i in range(threads)]
+    try:
+        for t in t_threads:
+            t.start()
+        gc.disable()
+        t_barrier.wait()
+        t_start = perf_counter()
+        for t in t_threads:
+            t.join()
+        for h in t_handlers:
+            if isinstance(h, lg._StreamHandlerBase):
+                h.flush()
+        t_seconds = perf_counter() - t_start
+    finally:
+        gc.enable()
+        _teardown(t_handlers)
+
+    t_all = sorted(l for latencies in t_latencies for l in latencies)
+    return {"throughput": len(t_all) / t_seconds,
+            "p50_us": _percentile(t_all, 50) / 1000, "p90_us": _percentile(t_all, 90) / 1000,
+            "p99_us": _percentile(t_all, 99) / 1000, "max_us": t_all[-1] / 1000}
+
+
+def _percentile(sorted_values: list[int], percent: float) -> float:
+    return float(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))])
+
+
+def run_suite(records: int = 2000, threads: tuple[int, ...] = (1, 4), only: Optional[str] = None, progress: Optional[Callable[[str], None]] = None) -> dict[str, dict[str, float]]:
+    """runs every use_std_config combination without msgbox and every file mode, each with all KINDS and thread counts
+    returnValue: {scenario name: run_scenario result}, only: run just the scenarios whose name contains this string"""
+    t_results: dict[str, dict[str, float]] = {}
+    t_stderr = lg.stderr
+    try:
+        with TemporaryDirectory() as t_dir, warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            t_setups: dict[str, Callable[[], list[lg.Handler]]] = {}
+            for use_stderr, use_logfile_error, use_logfile_verbose in product((False, True), repeat=3):
+                t_name = f"std_config[stderr={int(use_stderr)},error={int(use_logfile_error)},verbose={int(use_logfile_verbose)}]"
+                t_setups[t_name] = _std_config(t_dir, use_stderr, use_logfile_error, use_logfile_verbose)
+            for mode in FILE_MODES:
+                t_setups[f"file[{mode}]"] = _file_mode(t_dir, mode)
+
+            for (name, setup), kind, thread_count in product(t_setups.items(), KINDS, threads):
+                t_scenario = f"{name}/{kind}/threads={thread_count}"
+                if only != None and only not in t_scenario:
+                    continue
+                if progress != None:
+                    progress(t_scenario)
+                t_results[t_scenario] = run_scenario(setup, kind, thread_count, records)
+    finally:
+        lg.stderr = t_stderr
+    return t_results
+
+
+def compare_to_baseline(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], tolerance: float = 0.2) -> list[str]:
+    """returnValue: a description of every scenario whose throughput dropped or whose median latency rose by more than tolerance (fraction)"""
+    t_regressions: list[str] = []
+    for scenario, result in results.items():
+        t_base = baseline.get(scenario)
+        if t_base == None:
+            continue
+        if result["throughput"] < t_base["throughput"] * (1 - tolerance):
+            t_regressions.append(f"{scenario}: throughput {result['throughput']:.0f}/s < baseline {t_base['throughput']:.0f}/s")
+        if result["p50_us"] > t_base["p50_us"] * (1 + tolerance):
+            t_regressions.append(f"{scenario}: p50 {result['p50_us']:.2f} us > baseline {t_base['p50_us']:.2f} us")
+    return t_regressions
+
+
+if __name__ == "__main__":
+    t_parser = ArgumentParser(description="benchmarks for logger")
+    t_commands = t_parser.add_subparsers(dest="command")
+    t_commands.add_parser("micro", help="LogFile open time and formatter speed (default)")
+    t_suite = t_commands.add_parser("suite", help="throughput and latency of the logger configurations")
+    t_suite.add_argument("--records", type=int, default=2000, help="records per scenario")
+    t_suite.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    t_suite.add_argument("--only", help="run only scenarios whose name contains this string")
+    t_suite.add_argument("--json", help="write the results to this file")
+    t_suite.add_argument("--baseline", help="results file of an earlier run to compare against")
+    t_suite.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (default: 0.2)")
+    t_args = t_parser.parse_args()
+
+    if t_args.command == "suite":
+        t_results = run_suite(t_args.records, tuple(t_args.threads), t_args.only, progress=lambda s: print(f"running {s}", file=sys.stderr))
+        print(f"{'scenario':<70} {'records/s':>12} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'max us':>10}")
+        for scenario, result in t_results.items():
+            print(f"{scenario:<70} {result['throughput']:>12.0f} {result['p50_us']:>9.2f} {result['p90_us']:>9.2f} {result['p99_us']:>9.2f} {result['max_us']:>10.1f}")
+
+        if t_args.json != None:
+            with open(t_args.json, "w") as f:
+                dump({"meta": {"time": datetime.now().isoformat(timespec="seconds"), "python": python_version(), "platform": platform(),
+                               "records": t_args.records}, "results": t_results}, f, indent=2)
+
+        if t_args.baseline != None:
+            with open(t_args.baseline) as f:
+                t_regressions = compare_to_baseline(t_results, load(f)["results"], t_args.tolerance)
+            for r in t_regressions:
+                print(f"REGRESSION {r}")
+            if t_regressions:
+                sys.exit(1)
+            print("no regressions")
+    else:
+        print("LogFile open time by existing log size:")
+        for size, seconds in bench_logfile_open().items():
+            print(f"{size:>14} bytes: {seconds * 1000:8.3f} ms")
+
+        print("format time per record:")
+        for name, seconds in bench_formatter().items():
+            print(f"{name:>20}: {seconds * 1e6:8.3f} us")
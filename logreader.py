@@ -0,0 +1,542 @@
+# V1.4
+
+from __future__ import annotations
+from argparse import ArgumentParser
+from array import array
+from datetime import datetime
+from json import JSONDecodeError, loads
+from mmap import ACCESS_READ, mmap
+from os import path
+import re
+from struct import Struct
+from sys import stdout
+from time import localtime, mktime, strftime, strptime
+from typing import IO, Any, BinaryIO, Callable, Iterable, Iterator, Optional
+
+# Binary log format (logger.BinaryLogFile):
+# file:    BINARY_MAGIC, then entries, each starting with a one byte tag
+# session: BIN_SESSION (flags, blank_lines, log start, program start, pid, app name length, suffix length), app name, suffix
+#          starts a new string table and time base, written every time the file is opened
+# base:    BIN_BASE (time base in ms), record times are stored relative to the last time base
+# string:  BIN_STRING (id, length), utf-8 bytes, defines an interned string (logger names, message templates)
+# record:  BIN_RECORD (ms since base, levelno, flags, logger name id), then
+#          BIN_FLAG_LITERAL: BIN_LENGTH + utf-8 message, otherwise BIN_TEMPLATE (template id, number of args) and the args,
+#          each arg is a type tag (BIN_ARG_*) followed by its value (BIN_ARG_STRUCTS, strings: BIN_LENGTH + utf-8), BIN_FLAG_EXC: BIN_LENGTH + utf-8 exception text
+BINARY_MAGIC = b"LGB1"
+BIN_TAG_SESSION = b"S"
+BIN_TAG_BASE = b"B"
+BIN_TAG_STRING = b"T"
+BIN_TAG_RECORD = b"R"
+BIN_SESSION = Struct("<cBBddIHH")
+BIN_BASE = Struct("<cQ")
+BIN_STRING = Struct("<cII")
+BIN_RECORD = Struct("<cIBBI")
+BIN_TEMPLATE = Struct("<IB")
+BIN_LENGTH = Struct("<I")
+BIN_ARG_INT = b"i"
+BIN_ARG_LONG = b"q"
+BIN_ARG_FLOAT = b"d"
+BIN_ARG_STR = b"s"
+BIN_ARG_NONE = b"n"
+BIN_ARG_TRUE = b"t"
+BIN_ARG_FALSE = b"f"
+BIN_ARG_STRUCTS = {BIN_ARG_INT: Struct("<i"), BIN_ARG_LONG: Struct("<q"), BIN_ARG_FLOAT: Struct("<d")}
+BIN_FLAG_LITERAL = 1
+BIN_FLAG_EXC = 2
+BIN_FLAG_RAW = 4
+BIN_SESSION_INIT_MESSAGE = 1
+BIN_NO_STRING = 0xFFFF
+
+# Index format (LogFile(index=IndexPolicy(...)), <log>.idx):
+# file:  INDEX_MAGIC, then IDX_ENTRY blocks (first and last record time, start and end byte offset of the block in the log,
+#        number of records per level in IDX_LEVELS order and of all other levels), blocks are written in log order
+# bytes of the log that no block covers (written without index) are always scanned
+INDEX_MAGIC = b"LGI1"
+IDX_ENTRY = Struct("<ddQQ6I")
+IDX_LEVELS = (10, 20, 30, 40, 50)
+
+DEFAULT_FORMAT = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s"
+_LEVEL_NAMES = {0: "NOTSET", 10: "DEBUG", 20: "INFO", 30: "WARNING", 40: "ERROR", 50: "CRITICAL"}
+_LEVEL_VALUES = {v: k for k, v in _LEVEL_NAMES.items()}
+_FORMAT_FIELD = re.compile(r"%\((\w+)\)[-#0 +]*\d*(?:\.\d+)?[diouxXeEfFgGcrsa]")
+_ASCTIME_PATTERN = r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}"
+_INIT_LINE_PATTERN = rf"(?P<separator>(?:\r?\n)*)(?P<init>(?:(?P<app>[^\r\n]*?) - )?PID: \d+ - program start time: \[[^\]\r\n]*\] - log start time: \[(?P<init_time>{_ASCTIME_PATTERN})\][^\r\n]*)"
+_INIT_LINE = re.compile(_INIT_LINE_PATTERN)
+_LOAD_CHUNK_SIZE = 16 << 20
+_LOAD_SEGMENT_SIZE = 64 << 20
+LEVEL_CODE_INIT = -1
+
+
+class BinaryLogCorrupt(Exception):
+    def __init__(self, msg: str = 'binary log is corrupt', *args: Any, **kwargs: Any):
+        super().__init__(msg, *args, **kwargs)
+
+
+def open_log(file_path: str) -> IO[str]:
+    """opens a log file or a rotated segment (.gz / .xz) for reading"""
+    if file_path.endswith(".gz"):
+        import gzip
+        return gzip.open(file_path, "rt", encoding="utf-8", errors="replace")
+    if file_path.endswith(".xz"):
+        import lzma
+        return lzma.open(file_path, "rt", encoding="utf-8", errors="replace")
+    return open(file_path, "r", encoding="utf-8", errors="replace")
+
+
+def read_json_log(file_path: str) -> Iterator[dict[str, Any]]:
+    """yields the records of a file written by FileHandler(structured=True) one by one, other lines (init messages, blank lines) are skipped"""
+    with open_log(file_path) as f:
+        for line in f:
+            if not line.startswith("{"):
+                continue
+            try:
+                yield loads(line)
+            except JSONDecodeError:
+                continue
+
+
+class LogIndexEntry():
+    __slots__ = ("first_time", "last_time", "start", "end", "level_counts")
+
+    def __init__(self, first_time: float, last_time: float, start: int, end: int, level_counts: tuple[int, ...]):
+        self.first_time = first_time
+        self.last_time = last_time
+        self.start = start
+        self.end = end
+        self.level_counts = level_counts
+
+    def has_level(self, min_level: int) -> bool:
+        """True if the block may contain a record with min_level or higher"""
+        if self.level_counts[-1] > 0:
+            return True
+        return any(c > 0 for l, c in zip(IDX_LEVELS, self.level_counts) if l >= min_level)
+
+
+def read_log_index(file_path: str) -> list[LogIndexEntry]:
+    """the blocks of the index of the log file_path (<file_path>.idx), empty if there is no valid index"""
+    try:
+        with open(f"{file_path}.idx", "rb") as f:
+            t_data = f.read()
+    except FileNotFoundError:
+        return []
+    if not t_data.startswith(INDEX_MAGIC):
+        return []
+    t_count = (len(t_data) - len(INDEX_MAGIC)) // IDX_ENTRY.size  # a partially written last block is ignored
+    t_entries: list[LogIndexEntry] = []
+    for t_first, t_last, t_start, t_end, *t_counts in IDX_ENTRY.iter_unpack(t_data[len(INDEX_MAGIC):len(INDEX_MAGIC) + t_count * IDX_ENTRY.size]):
+        t_entries.append(LogIndexEntry(t_first, t_last, t_start, t_end, tuple(t_counts)))
+    return t_entries
+
+
+def query_log(file_path: str, *, start: Optional[datetime | float] = None, end: Optional[datetime | float] = None, min_level: int | str = 0, format: str = DEFAULT_FORMAT) -> Iterator[str]:
+    """yields the records (including continuation lines like tracebacks) of a log file written with format
+    that were logged between start and end (inclusive) with min_level or higher,
+    only the parts of the file the index marks as possibly matching are read (without index the whole file is scanned)"""
+    t_start = start.timestamp() if isinstance(start, datetime) else start
+    t_end = end.timestamp() if isinstance(end, datetime) else end
+    t_min_level = _LEVEL_VALUES[min_level.upper()] if isinstance(min_level, str) else min_level
+    t_size = path.getsize(file_path)
+    if t_size == 0:
+        return
+    t_ranges = _query_ranges(read_log_index(file_path), t_size, t_start, t_end, t_min_level)
+    t_pattern = _compile_line_pattern(format)
+    t_times: dict[str, float] = {}
+
+    with open(file_path, "rb") as f, mmap(f.fileno(), 0, access=ACCESS_READ) as m:
+        for t_range_start, t_range_end in t_ranges:
+            t_record: list[str] = []
+            t_match_record = False
+            for t_line in _iter_lines(m, t_range_start, t_range_end):
+                t_text = t_line.decode("utf-8", errors="replace")
+                if (t_match := t_pattern.match(t_text)) == None:
+                    if t_match_record and _INIT_LINE.match(t_text) != None:
+                        yield "".join(t_record)
+                        t_match_record = False
+                    elif t_match_record:
+                        t_record.append(t_text)
+                    continue
+                if t_match_record:
+                    yield "".join(t_record)
+                t_asctime = t_match["asctime"]
+                if (t_second := t_times.get(t_asctime[:19])) == None:
+                    t_second = t_times[t_asctime[:19]] = mktime(strptime(t_asctime[:19], "%Y-%m-%d %H:%M:%S"))
+                t_time = t_second + int(t_asctime[20:]) / 1000
+                t_level = _LEVEL_VALUES.get(t_match["levelname"], 0) if "levelname" in t_pattern.groupindex else 0
+                t_match_record = (t_start == None or t_time >= t_start) and (t_end == None or t_time <= t_end) and t_level >= t_min_level
+                t_record = [t_text]
+            if t_match_record:
+                yield "".join(t_record)
+
+
+def _query_ranges(entries: list[LogIndexEntry], size: int, start: Optional[float], end: Optional[float], min_level: int) -> list[tuple[int, int]]:
+    """merged byte ranges of the log that have to be scanned"""
+    t_ranges: list[tuple[int, int]] = []
+
+    def add(range_start: int, range_end: int) -> None:
+        if range_end <= range_start:
+            return
+        if t_ranges and t_ranges[-1][1] == range_start:
+            t_ranges[-1] = (t_ranges[-1][0], range_end)
+        else:
+            t_ranges.append((range_start, range_end))
+
+    t_pos = 0
+    for e in entries:
+        if e.end > size:
+            break
+        add(t_pos, e.start)
+        if (end == None or e.first_time <= end) and (start == None or e.last_time >= start) and e.has_level(min_level):
+            add(e.start, e.end)
+        t_pos = max(t_pos, e.end)
+    add(t_pos, size)
+    return t_ranges
+
+
+def _iter_lines(m: mmap, start: int, end: int) -> Iterator[bytes]:
+    t_pos = start
+    while t_pos < end:
+        t_newline = m.find(b"\n", t_pos, end)
+        t_next = end if t_newline == -1 else t_newline + 1
+        yield m[t_pos:t_next]
+        t_pos = t_next
+
+
+def _compile_line_pattern(format: str) -> re.Pattern[str]:
+    """regex matching the start of a record line written with format up to %(message)s"""
+    t_pattern = ""
+    t_pos = 0
+    t_fields: set[str] = set()
+    for t_field in _FORMAT_FIELD.finditer(format):
+        t_pattern += re.escape(format[t_pos:t_field.start()].replace("%%", "%"))
+        t_pos = t_field.end()
+        t_name = t_field[1]
+        if t_name == "message":
+            break
+        if t_name in t_fields:
+            t_pattern += "(?:.*?)"
+            continue
+        t_fields.add(t_name)
+        if t_name == "asctime":
+            t_pattern += f"(?P<asctime>{_ASCTIME_PATTERN})"
+        elif t_name == "levelname":
+            t_pattern += r"(?P<levelname>\S+)"
+        else:
+            t_pattern += f"(?P<{t_name}>.*?)"
+    else:
+        t_pattern += re.escape(format[t_pos:].replace("%%", "%"))
+    if "asctime" not in t_fields:
+        raise ValueError("format has to contain %(asctime)s")
+    return re.compile(t_pattern)
+
+
+def _convert_time_to_string(timestamp: float) -> str:
+    t_time = datetime.fromtimestamp(timestamp)
+    return f"{t_time.strftime('%Y-%m-%d %H:%M:%S')},{t_time.microsecond // 1000:03d}"
+
+
+def _read_exact(f: BinaryIO, size: int) -> bytes:
+    t_data = f.read(size)
+    if len(t_data) != size:
+        raise BinaryLogCorrupt("unexpected end of binary log")
+    return t_data
+
+
+def _read_arg(f: BinaryIO) -> Any:
+    t_tag = _read_exact(f, 1)
+    if (t_struct := BIN_ARG_STRUCTS.get(t_tag)) != None:
+        return t_struct.unpack(_read_exact(f, t_struct.size))[0]
+    if t_tag == BIN_ARG_STR:
+        return _read_exact(f, BIN_LENGTH.unpack(_read_exact(f, BIN_LENGTH.size))[0]).decode("utf-8", errors="replace")
+    if t_tag == BIN_ARG_NONE:
+        return None
+    if t_tag == BIN_ARG_TRUE:
+        return True
+    if t_tag == BIN_ARG_FALSE:
+        return False
+    raise BinaryLogCorrupt(f"unknown argument type {t_tag!r}")
+
+
+def decode_binary_log(file_path: str, format: str = DEFAULT_FORMAT) -> Iterator[str]:
+    """renders a file written by logger.BinaryLogFile back into the text format of LogFile, yields one record (incl. newline) at a time"""
+    with open(file_path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise BinaryLogCorrupt("not a binary log")
+        t_strings: dict[int, str] = {}
+        t_base_ms = 0
+        t_first_session = True
+        t_time_cache: tuple[int, str] = (-1, "")
+        while (t_tag := f.read(1)):
+            if t_tag == BIN_TAG_RECORD:
+                _, t_offset, t_levelno, t_flags, t_name_id = BIN_RECORD.unpack(t_tag + _read_exact(f, BIN_RECORD.size - 1))
+                if t_flags & BIN_FLAG_LITERAL:
+                    t_message = _read_exact(f, BIN_LENGTH.unpack(_read_exact(f, BIN_LENGTH.size))[0]).decode("utf-8", errors="replace")
+                else:
+                    t_template_id, t_nargs = BIN_TEMPLATE.unpack(_read_exact(f, BIN_TEMPLATE.size))
+                    t_message = t_strings[t_template_id]
+                    if t_nargs:
+                        t_args = tuple(_read_arg(f) for _ in range(t_nargs))
+                        try:
+                            t_message = t_message % t_args
+                        except (TypeError, ValueError):
+                            # template and args are stored even if they do not match, the rest of the file is still decoded
+                            t_message = f"{t_message} {t_args!r}"
+                t_exc = ""
+                if t_flags & BIN_FLAG_EXC:
+                    t_exc = _read_exact(f, BIN_LENGTH.unpack(_read_exact(f, BIN_LENGTH.size))[0]).decode("utf-8", errors="replace")
+                if t_flags & BIN_FLAG_RAW:
+                    yield f"{t_message}\n"
+                    continue
+                t_ms = t_base_ms + t_offset
+                if t_ms // 1000 != t_time_cache[0]:
+                    t_time_cache = (t_ms // 1000, strftime("%Y-%m-%d %H:%M:%S", localtime(t_ms // 1000)))
+                t_text = format % {"asctime": f"{t_time_cache[1]},{t_ms % 1000:03d}", "name": t_strings[t_name_id],
+                                   "levelname": _LEVEL_NAMES.get(t_levelno, f"Level {t_levelno}"), "levelno": t_levelno,
+                                   "message": t_message, "created": t_ms / 1000}
+                if t_exc:
+                    t_text = f"{t_text}\n{t_exc}"
+                yield f"{t_text}\n"
+            elif t_tag == BIN_TAG_STRING:
+                _, t_id, t_len = BIN_STRING.unpack(t_tag + _read_exact(f, BIN_STRING.size - 1))
+                t_strings[t_id] = _read_exact(f, t_len).decode("utf-8", errors="replace")
+            elif t_tag == BIN_TAG_BASE:
+                t_base_ms = BIN_BASE.unpack(t_tag + _read_exact(f, BIN_BASE.size - 1))[1]
+            elif t_tag == BIN_TAG_SESSION:
+                _, t_flags, t_blank_lines, t_log_start, t_program_start, t_pid, t_app_len, t_suffix_len = BIN_SESSION.unpack(
+                    t_tag + _read_exact(f, BIN_SESSION.size - 1))
+                t_app_name = None if t_app_len == BIN_NO_STRING else _read_exact(f, t_app_len).decode("utf-8", errors="replace")
+                t_suffix = _read_exact(f, t_suffix_len).decode("utf-8", errors="replace")
+                t_strings = {}
+                t_base_ms = int(t_log_start * 1000)
+                if not t_first_session and t_blank_lines:
+                    yield "\n" * t_blank_lines
+                t_first_session = False
+                if t_flags & BIN_SESSION_INIT_MESSAGE:
+                    t_appname = f"{t_app_name} - " if t_app_name != None else ""
+                    yield f"{t_appname}PID: {t_pid} - program start time: [{_convert_time_to_string(t_program_start)}] - log start time: \
+[{_convert_time_to_string(t_log_start)}] {t_suffix}\n"
+            else:
+                raise BinaryLogCorrupt(f"unknown entry {t_tag!r}")
+
+
+class LogColumns():
+    """records of one or more log files as columns (index i is the i-th record over all files in the given order):
+    times (unix time), levels (levelno, LEVEL_CODE_INIT for init message lines), name_ids (index into names, for init messages the app name),
+    files (index into file_paths), message_offsets / message_lengths (bytes of the message in the (decompressed) file, including continuation lines)"""
+
+    def __init__(self, file_paths: list[str]):
+        self.file_paths = file_paths
+        self.names: list[str] = []
+        self.times = array("d")
+        self.levels = array("h")
+        self.name_ids = array("I")
+        self.files = array("H")
+        self.message_offsets = array("Q")
+        self.message_lengths = array("I")
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def message(self, i: int) -> str:
+        """reads the message of record i from its file"""
+        t_path = self.file_paths[self.files[i]]
+        if t_path.endswith(".gz"):
+            import gzip
+            t_open: Callable[[str], IO[bytes]] = lambda p: gzip.open(p, "rb")
+        elif t_path.endswith(".xz"):
+            import lzma
+            t_open = lambda p: lzma.open(p, "rb")
+        else:
+            t_open = lambda p: open(p, "rb")
+        with t_open(t_path) as f:
+            f.seek(self.message_offsets[i])
+            return f.read(self.message_lengths[i]).decode("utf-8", errors="replace").rstrip("\r\n")
+
+    def to_numpy(self) -> dict[str, Any]:
+        """the columns as numpy arrays (without copying)"""
+        import numpy
+        return {"times": numpy.frombuffer(self.times, numpy.float64), "levels": numpy.frombuffer(self.levels, numpy.int16),
+                "name_ids": numpy.frombuffer(self.name_ids, numpy.uint32), "files": numpy.frombuffer(self.files, numpy.uint16),
+                "message_offsets": numpy.frombuffer(self.message_offsets, numpy.uint64), "message_lengths": numpy.frombuffer(self.message_lengths, numpy.uint32)}
+
+
+def load_log_columns(file_paths: str | list[str], *, format: str = DEFAULT_FORMAT, processes: Optional[int] = None, use_numpy: Optional[bool] = None) -> LogColumns:
+    """parses log files written by LogFile with format (e.g. a log and its rotated segments, oldest first) in large chunks into LogColumns
+    processes: the files are split into segments that are parsed by a multiprocessing pool of this size (default: one per cpu, 1: no pool)
+    use_numpy: converts the timestamps with numpy (default: if numpy is installed)
+    when using processes on Windows, call this only from below an if __name__ == "__main__" guard"""
+    if isinstance(file_paths, str):
+        file_paths = [file_paths]
+    if use_numpy == None:
+        try:
+            import numpy  # noqa: F401
+            use_numpy = True
+        except ImportError:
+            use_numpy = False
+    t_pattern = _compile_load_pattern(format)
+    t_tasks = [(i, p, t_start, t_end, t_pattern, use_numpy) for i, p in enumerate(file_paths) for t_start, t_end in _split_log_file(p)]
+
+    if processes == 1 or len(t_tasks) < 2:
+        t_segments = map(_parse_log_segment, t_tasks)
+        return _merge_log_segments(file_paths, t_segments)
+    from multiprocessing import Pool
+    with Pool(processes) as t_pool:
+        return _merge_log_segments(file_paths, t_pool.imap(_parse_log_segment, t_tasks))
+
+
+def _compile_load_pattern(format: str) -> bytes:
+    t_record = _compile_line_pattern(format).pattern
+    if "name" not in re.compile(t_record).groupindex:
+        t_record += "(?P<name>)"
+    if "levelname" not in re.compile(t_record).groupindex:
+        t_record += "(?P<levelname>)"
+    return f"^(?:{t_record}|{_INIT_LINE_PATTERN})".encode("utf-8")
+
+
+def _split_log_file(file_path: str) -> list[tuple[int, Optional[int]]]:
+    """byte ranges of about _LOAD_SEGMENT_SIZE that start at line starts (compressed files are not split)"""
+    if file_path.endswith((".gz", ".xz")):
+        return [(0, None)]
+    t_size = path.getsize(file_path)
+    t_bounds = [0]
+    with open(file_path, "rb") as f:
+        for t_pos in range(_LOAD_SEGMENT_SIZE, t_size, _LOAD_SEGMENT_SIZE):
+            f.seek(t_pos)
+            f.readline()
+            if (t_bound := f.tell()) > t_bounds[-1] and t_bound < t_size:
+                t_bounds.append(t_bound)
+    t_bounds.append(t_size)
+    return list(zip(t_bounds, t_bounds[1:]))
+
+
+def _parse_log_segment(task: tuple[int, str, int, Optional[int], bytes, bool]) -> tuple[int, list[str], array[float], array[int], array[int], array[int], array[int], int]:
+    """parses the byte range start to end (None: whole file) of a log file,
+    returns file index, names, times, levels, name ids, line starts, message starts and the end offset"""
+    t_file, t_path, t_start, t_end, t_pattern_source, t_use_numpy = task
+    t_pattern = re.compile(t_pattern_source, re.MULTILINE)
+    t_names: dict[bytes, int] = {}
+    t_level_codes = {name.encode(): level for name, level in _LEVEL_VALUES.items()}
+    t_asctimes: list[bytes] = []
+    t_levels, t_name_ids, t_line_starts, t_message_starts = array("h"), array("I"), array("q"), array("q")
+    add_level, add_name_id, add_line_start, add_message_start, add_asctime = t_levels.append, t_name_ids.append, t_line_starts.append, t_message_starts.append, t_asctimes.append
+    t_asctime_group, t_name_group, t_levelname_group, t_init_group, t_init_time_group, t_app_group = (t_pattern.groupindex[g] for g in ("asctime", "name", "levelname", "init", "init_time", "app"))
+
+    if t_path.endswith(".gz"):
+        import gzip
+        f: IO[bytes] = gzip.open(t_path, "rb")
+    elif t_path.endswith(".xz"):
+        import lzma
+        f = lzma.open(t_path, "rb")
+    else:
+        f = open(t_path, "rb")
+        f.seek(t_start)
+    with f:
+        t_offset = t_start
+        t_rest = b""
+        while True:
+            t_data = f.read(_LOAD_CHUNK_SIZE if t_end == None else min(_LOAD_CHUNK_SIZE, t_end - t_offset - len(t_rest)))
+            t_chunk = t_rest + t_data
+            t_cut = len(t_chunk) if not t_data else t_chunk.rfind(b"\n") + 1
+            for m in t_pattern.finditer(t_chunk, 0, t_cut):
+                t_asctime, t_name, t_levelname = m.group(t_asctime_group, t_name_group, t_levelname_group)
+                t_line_start, t_message_start = m.span()
+                if t_asctime != None:
+                    t_level = t_level_codes.get(t_levelname, 0)
+                else:
+                    t_asctime, t_name = m.group(t_init_time_group, t_app_group)
+                    t_name = t_name or b""
+                    t_level = LEVEL_CODE_INIT
+                    t_message_start = m.start(t_init_group)
+                if (t_name_id := t_names.get(t_name)) == None:
+                    t_name_id = t_names[t_name] = len(t_names)
+                add_level(t_level)
+                add_name_id(t_name_id)
+                add_line_start(t_offset + t_line_start)
+                add_message_start(t_offset + t_message_start)
+                add_asctime(t_asctime)
+            t_offset += t_cut
+            t_rest = t_chunk[t_cut:]
+            if not t_data:
+                break
+
+    t_times = _convert_asctimes_numpy(t_asctimes) if t_use_numpy else _convert_asctimes(t_asctimes)
+    return t_file, [n.decode("utf-8", errors="replace") for n in t_names], t_times, t_levels, t_name_ids, t_line_starts, t_message_starts, t_offset
+
+
+def _convert_asctimes(asctimes: list[bytes]) -> array[float]:
+    t_seconds: dict[bytes, float] = {}
+    t_times = array("d")
+    for t_asctime in asctimes:
+        if (t_second := t_seconds.get(t_asctime[:19])) == None:
+            t_second = t_seconds[t_asctime[:19]] = mktime(strptime(t_asctime[:19].decode(), "%Y-%m-%d %H:%M:%S"))
+        t_times.append(t_second + int(t_asctime[20:]) / 1000)
+    return t_times
+
+
+def _convert_asctimes_numpy(asctimes: list[bytes]) -> array[float]:
+    """vectorized _convert_asctimes, mktime (local time, dst) is only called once per distinct hour"""
+    import numpy
+    t_times = array("d")
+    if not asctimes:
+        return t_times
+    t_digits = (numpy.frombuffer(b"".join(asctimes), numpy.uint8).reshape(-1, 23).astype(numpy.int64) - ord("0"))
+
+    def number(first: int, last: int) -> Any:
+        t_value = t_digits[:, first]
+        for i in range(first + 1, last):
+            t_value = t_value * 10 + t_digits[:, i]
+        return t_value
+
+    t_hours = ((number(0, 4) * 100 + number(5, 7)) * 100 + number(8, 10)) * 100 + number(11, 13)
+    t_unique_hours, t_inverse = numpy.unique(t_hours, return_inverse=True)
+    t_hour_starts = numpy.array([mktime((int(h) // 1000000, int(h) // 10000 % 100, int(h) // 100 % 100, int(h) % 100, 0, 0, 0, 0, -1)) for h in t_unique_hours])
+    t_result = t_hour_starts[t_inverse] + number(14, 16) * 60 + number(17, 19) + number(20, 23) / 1000
+    t_times.frombytes(t_result.astype(numpy.float64).tobytes())
+    return t_times
+
+
+def _merge_log_segments(file_paths: list[str], segments: Iterable[tuple[int, list[str], array[float], array[int], array[int], array[int], array[int], int]]) -> LogColumns:
+    """joins the segments (in file and offset order) and computes the message lengths (up to the next record or the end of the file)"""
+    t_columns = LogColumns(file_paths)
+    t_names: dict[str, int] = {}
+    t_lengths = t_columns.message_lengths
+    t_pending_file = -1  # the length of the last record is known with the next record of its file or the end of its file
+    t_pending_start = t_pending_end = 0
+
+    for t_file, t_segment_names, t_times, t_levels, t_name_ids, t_line_starts, t_message_starts, t_end in segments:
+        t_name_map = array("I", (t_names.setdefault(n, len(t_names)) for n in t_segment_names))
+        t_columns.times.extend(t_times)
+        t_columns.levels.extend(t_levels)
+        t_columns.name_ids.extend(array("I", (t_name_map[i] for i in t_name_ids)))
+        t_columns.files.extend(array("H", [t_file]) * len(t_times))
+        t_columns.message_offsets.extend(array("Q", t_message_starts))
+        for t_line_start, t_message_start in zip(t_line_starts, t_message_starts):
+            if t_pending_file != -1:
+                t_lengths.append(max((t_line_start if t_pending_file == t_file else t_pending_end) - t_pending_start, 0))
+            t_pending_file, t_pending_start = t_file, t_message_start
+        if t_pending_file == t_file:
+            t_pending_end = t_end
+    if t_pending_file != -1:
+        t_lengths.append(max(t_pending_end - t_pending_start, 0))
+    t_columns.names = list(t_names)
+    return t_columns
+
+
+if __name__ == "__main__":
+    t_parser = ArgumentParser(description="tools for files written by logger")
+    t_commands = t_parser.add_subparsers(dest="command", required=True)
+    t_decode = t_commands.add_parser("decode", help="render a binary log as text")
+    t_decode.add_argument("file")
+    t_query = t_commands.add_parser("query", help="print the records of a log file in a time range (uses <file>.idx if present)")
+    t_query.add_argument("file")
+    t_query.add_argument("--start", type=datetime.fromisoformat, help="e.g. '2024-05-01 14:02'")
+    t_query.add_argument("--end", type=datetime.fromisoformat)
+    t_query.add_argument("--level", default="NOTSET", choices=list(_LEVEL_VALUES))
+    t_query.add_argument("--format", default=DEFAULT_FORMAT)
+    t_args = t_parser.parse_args()
+
+    if t_args.command == "decode":
+        for t_text in decode_binary_log(t_args.file):
+            stdout.write(t_text)
+    elif t_args.command == "query":
+        for t_text in query_log(t_args.file, start=t_args.start, end=t_args.end, min_level=t_args.level, format=t_args.format):
+            stdout.write(t_text)
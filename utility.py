@@ -1,10 +1,15 @@
-# V1.7
+# V1.12
 
 from __future__ import annotations
-from io import TextIOWrapper
-from os import fsync, listdir, mkdir, path, rename
+from contextlib import contextmanager
+from enum import Enum
+from io import BufferedWriter, FileIO, TextIOWrapper
+from locale import getpreferredencoding
+from os import O_APPEND, O_CREAT, O_WRONLY, close, fsync, linesep, listdir, mkdir, open as os_open, path, rename, write as os_write
 from shutil import move
-from typing import IO, Any, Callable, Optional, Type
+from threading import Lock, RLock, Timer
+from time import monotonic
+from typing import IO, Any, Callable, Iterator, Optional, Type
 from warnings import warn
 from send2trash import send2trash as s2t
 import ctypes
@@ -13,6 +18,14 @@ from sys import stderr
 from psutil import process_iter
 from pyautogui import hotkey
 
+try:
+    import fcntl
+    O_BINARY = 0
+except ImportError:
+    fcntl = None
+    import msvcrt
+    from os import O_BINARY
+
 
 class StreamAutoFlush(TextIOWrapper):
     def __init__(self, buffer: IO[bytes]):
@@ -24,14 +37,88 @@ class StreamAutoFlush(TextIOWrapper):
         return t_return
 
 
+class SYNC_MODE(Enum):
+    ALWAYS = 0
+    INTERVAL = 1
+    BYTES = 2
+    MANUAL = 3
+
+
+class SyncPolicy:
+    """ALWAYS: fsync after every write
+    INTERVAL: fsync at most every interval_ms
+    BYTES: fsync once threshold_bytes are written since the last fsync
+    MANUAL: fsync only on sync()
+    unsynced data is always synced after max_delay_ms at the latest (not for ALWAYS)"""
+
+    def __init__(self, mode: SYNC_MODE = SYNC_MODE.ALWAYS, *, interval_ms: int = 1000, threshold_bytes: int = 65536, max_delay_ms: int = 1000):
+        self.mode = mode
+        self.interval_ms = interval_ms
+        self.threshold_bytes = threshold_bytes
+        self.max_delay_ms = max_delay_ms
+
+
+class _FileSyncer:
+    def __init__(self, fileno: Callable[[], int], policy: SyncPolicy):
+        self.__fileno = fileno
+        self.__policy = policy
+        self.__lock = Lock()
+        self.__unsynced = 0
+        self.__last_sync = monotonic()
+        self.__timer: Optional[Timer] = None
+
+    def written(self, size: int) -> None:
+        t_mode = self.__policy.mode
+        if t_mode == SYNC_MODE.ALWAYS:
+            fsync(self.__fileno())
+            return
+        with self.__lock:
+            self.__unsynced += size
+            if t_mode == SYNC_MODE.INTERVAL and (monotonic() - self.__last_sync) * 1000 >= self.__policy.interval_ms:
+                self.__sync()
+            elif t_mode == SYNC_MODE.BYTES and self.__unsynced >= self.__policy.threshold_bytes:
+                self.__sync()
+            if self.__unsynced > 0 and self.__timer == None:
+                self.__timer = Timer(self.__policy.max_delay_ms / 1000, self.__on_timer)
+                self.__timer.daemon = True
+                self.__timer.start()
+
+    def sync(self) -> None:
+        with self.__lock:
+            self.__sync()
+
+    def __sync(self) -> None:
+        if self.__unsynced == 0:
+            return
+        fsync(self.__fileno())
+        self.__unsynced = 0
+        self.__last_sync = monotonic()
+
+    def __on_timer(self) -> None:
+        with self.__lock:
+            self.__timer = None
+            try:
+                self.__sync()
+            except ValueError:  # file already closed
+                pass
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__timer != None:
+                self.__timer.cancel()
+                self.__timer = None
+            self.__sync()
+
+
 class FileAutoSave(TextIOWrapper):
     @property
     def path(self) -> str:
         return path.abspath(self._path)
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, sync_policy: Optional[SyncPolicy] = None):
         super().__init__(open(path, "a").detach())
         self._path: str = path
+        self._syncer = _FileSyncer(self.fileno, sync_policy if sync_policy != None else SyncPolicy())
 
     def __del__(self):
         self.close()
@@ -39,9 +126,138 @@ class FileAutoSave(TextIOWrapper):
     def write(self, text: str) -> int:
         t_return = super().write(text)
         self.flush()
-        fsync(self.fileno())
+        self._syncer.written(t_return)
         return t_return
 
+    def sync(self) -> None:
+        """fsync all data written so far"""
+        self._syncer.sync()
+
+    def close(self) -> None:
+        if not self.closed:
+            self._syncer.close()
+        super().close()
+
+
+class BinaryFileAutoSave(BufferedWriter):
+    @property
+    def path(self) -> str:
+        return path.abspath(self._path)
+
+    def __init__(self, path: str, sync_policy: Optional[SyncPolicy] = None):
+        super().__init__(FileIO(path, "ab"))
+        self._path: str = path
+        self._syncer = _FileSyncer(self.fileno, sync_policy if sync_policy != None else SyncPolicy())
+
+    def __del__(self):
+        self.close()
+
+    def write(self, data: bytes) -> int:  # type:ignore
+        t_return = super().write(data)
+        self.flush()
+        self._syncer.written(t_return)
+        return t_return
+
+    def sync(self) -> None:
+        """fsync all data written so far"""
+        self._syncer.sync()
+
+    def close(self) -> None:
+        if not self.closed:
+            self._syncer.close()
+        super().close()
+
+
+class AppendFile():
+    """text file opened with O_APPEND that several processes can write to at the same time,
+    every write is exactly one os.write, so a single write never interleaves with writes of other processes
+    (on Windows O_APPEND is a seek followed by a write, so there every write holds lock())"""
+
+    @property
+    def path(self) -> str:
+        return path.abspath(self._path)
+
+    def __init__(self, path: str, sync_policy: Optional[SyncPolicy] = None, encoding: Optional[str] = None):
+        self._path: str = path
+        self._encoding = encoding if encoding != None else getpreferredencoding(False)
+        self._fd: Optional[int] = None
+        self._lock_fd: Optional[int] = None
+        self._lock_depth = 0
+        self._thread_lock = RLock()
+        self._fd = os_open(path, O_WRONLY | O_APPEND | O_CREAT | O_BINARY, 0o666)
+        self._syncer = _FileSyncer(self.fileno, sync_policy if sync_policy != None else SyncPolicy())
+
+    def __del__(self):
+        self.close()
+
+    def write(self, text: str) -> int:
+        if linesep != "\n":
+            text = text.replace("\n", linesep)
+        t_data = text.encode(self._encoding, errors="replace")
+        if fcntl != None:
+            self.__write_all(t_data)
+        else:
+            with self.lock():
+                self.__write_all(t_data)
+        self._syncer.written(len(t_data))
+        return len(text)
+
+    def __write_all(self, data: bytes) -> None:
+        # a short write (e.g. interrupted by a signal) is continued, a full disk raises OSError
+        t_view = memoryview(data)
+        while t_view:
+            t_view = t_view[os_write(self.fileno(), t_view):]
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """advisory lock for sequences of writes that have to stay together (flock on POSIX, a locked <path>.lock file on Windows)"""
+        if fcntl != None:
+            fcntl.flock(self.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.fileno(), fcntl.LOCK_UN)
+            return
+        # reentrant, the writes inside a locked sequence take the lock again
+        with self._thread_lock:
+            if self._lock_depth == 0:
+                if self._lock_fd == None:
+                    self._lock_fd = os_open(f"{self._path}.lock", O_WRONLY | O_CREAT, 0o666)
+                msvcrt.locking(self._lock_fd, msvcrt.LK_LOCK, 1)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    msvcrt.locking(self._lock_fd, msvcrt.LK_UNLCK, 1)
+
+    def flush(self) -> None:
+        pass
+
+    def sync(self) -> None:
+        """fsync all data written so far"""
+        self._syncer.sync()
+
+    def fileno(self) -> int:
+        if self._fd == None:
+            raise ValueError("I/O operation on closed file")
+        return self._fd
+
+    @property
+    def closed(self) -> bool:
+        return self._fd == None
+
+    def close(self) -> None:
+        if self._fd == None:
+            return
+        self._syncer.close()
+        close(self._fd)
+        self._fd = None
+        if self._lock_fd != None:
+            close(self._lock_fd)
+            self._lock_fd = None
+
 
 class PathNotAFile(Exception):
     def __init__(self, msg: str = 'given path is not a file', *args: Any, **kwargs: Any):